@@ -18,6 +18,7 @@ Si no se configuran credenciales, los métodos devolverán errores controlados
 para facilitar el diagnóstico.
 """
 
+import asyncio
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 from uuid import uuid4
@@ -25,7 +26,7 @@ import hashlib
 
 try:
     from azure.core.credentials import AzureKeyCredential
-    from azure.search.documents import SearchClient
+    from azure.search.documents import SearchClient, SearchIndexingBufferedSender
     from azure.search.documents.indexes import SearchIndexClient
     from azure.search.documents.indexes.models import (
         SimpleField,
@@ -42,7 +43,7 @@ try:
     )
 except Exception:  # pragma: no cover - permite importar sin dependencias instaladas
     AzureKeyCredential = object  # type: ignore
-    SearchClient = object  # type: ignore
+    SearchClient = SearchIndexingBufferedSender = object  # type: ignore
     SearchIndexClient = object  # type: ignore
     SimpleField = SearchField = SearchFieldDataType = object  # type: ignore
     VectorSearch = HnswAlgorithmConfiguration = VectorSearchProfile = object  # type: ignore
@@ -320,15 +321,40 @@ class AzureProductSearchService:
             return {"success": True, "uploaded": 0}
 
         try:
-            batch_size = 100
-            uploaded = 0
-            for i in range(0, len(documents), batch_size):
-                batch = documents[i : i + batch_size]
-                self._search_client.upload_documents(documents=batch)
-                uploaded += len(batch)
-            return {"success": True, "uploaded": uploaded}
+            return await asyncio.to_thread(self._upload_buffered, documents)
         except Exception as e:  # pragma: no cover
             return {"success": False, "uploaded": 0, "error": str(e)}
 
+    def _upload_buffered(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Sube documentos con `SearchIndexingBufferedSender`.
+
+        El SDK agrupa los documentos en lotes, reintenta los 503/429 con backoff
+        y divide los lotes demasiado grandes. Los documentos que fallan de forma
+        definitiva se reportan vía `on_error` y se descuentan del total.
+        """
+        failed: List[str] = []
+
+        def _on_error(action: Any) -> None:
+            doc = getattr(action, "additional_properties", None) or {}
+            failed.append(str(doc.get("id", "?")))
+
+        with SearchIndexingBufferedSender(
+            endpoint=self.config.endpoint,
+            index_name=self.config.index_name,
+            credential=self._credential,
+            initial_batch_action_count=100,
+            on_error=_on_error,
+        ) as sender:
+            sender.upload_documents(documents=documents)
+            sender.flush()
+
+        uploaded = len(documents) - len(failed)
+        if failed:
+            return {
+                "success": False,
+                "uploaded": uploaded,
+                "error": f"{len(failed)} documentos fallaron: {', '.join(failed[:10])}",
+            }
+        return {"success": True, "uploaded": uploaded}
 
 __all__ = ["AzureProductSearchService", "ProductSearchConfig", "compute_store_id"]
@@ -174,6 +174,35 @@ class Settings:
         self.AZURE_SEARCH_CONTENT_FIELDS = parse_list_from_env(
             "AZURE_SEARCH_CONTENT_FIELDS", ["name", "description"]
         )
+        # Campo clave del índice y campo SKU; si coinciden se usa la API de Lookup
+        self.AZURE_SEARCH_KEY_FIELD = os.getenv("AZURE_SEARCH_KEY_FIELD", "id")
+        self.AZURE_SEARCH_SKU_FIELD = os.getenv("AZURE_SEARCH_SKU_FIELD", "sku")
+        # Configuración semántica del índice; vacía desactiva el re-ranker
+        # (requiere un tier de Azure Search con búsqueda semántica habilitada)
+        self.AZURE_SEARCH_SEMANTIC_CONFIG = os.getenv("AZURE_SEARCH_SEMANTIC_CONFIG", "")
+        # A partir de este `top` la respuesta se parsea en streaming (0 lo desactiva)
+        self.AZURE_SEARCH_STREAM_MIN_TOP = int(os.getenv("AZURE_SEARCH_STREAM_MIN_TOP", "50"))
+        # Caché de búsquedas por SKU (segundos); las negativas expiran antes
+        self.SKU_CACHE_TTL = int(os.getenv("SKU_CACHE_TTL", "60"))
+        self.SKU_CACHE_NEGATIVE_TTL = int(os.getenv("SKU_CACHE_NEGATIVE_TTL", "5"))
+        self.SKU_CACHE_MAXSIZE = int(os.getenv("SKU_CACHE_MAXSIZE", "10000"))
+        # Cliente HTTP compartido hacia Azure Search / Azure OpenAI
+        self.AZURE_HTTP_TIMEOUT_SECONDS = float(os.getenv("AZURE_HTTP_TIMEOUT_SECONDS", "30"))
+        self.AZURE_HTTP_MAX_CONNECTIONS = int(os.getenv("AZURE_HTTP_MAX_CONNECTIONS", "100"))
+        self.AZURE_HTTP_MAX_KEEPALIVE = int(os.getenv("AZURE_HTTP_MAX_KEEPALIVE", "20"))
+        # Peticiones simultáneas máximas hacia Azure Search/OpenAI por proceso
+        self.AZURE_HTTP_MAX_CONCURRENCY = int(os.getenv("AZURE_HTTP_MAX_CONCURRENCY", "16"))
+        # Micro-batching de embeddings: peticiones concurrentes se agrupan en un solo POST
+        self.EMBEDDINGS_BATCH_MAX = int(os.getenv("EMBEDDINGS_BATCH_MAX", "16"))
+        self.EMBEDDINGS_BATCH_WAIT_MS = int(os.getenv("EMBEDDINGS_BATCH_WAIT_MS", "30"))
+        # Caché de embeddings por consulta (segundos / entradas)
+        self.EMBEDDINGS_CACHE_TTL = int(os.getenv("EMBEDDINGS_CACHE_TTL", "3600"))
+        self.EMBEDDINGS_CACHE_MAXSIZE = int(os.getenv("EMBEDDINGS_CACHE_MAXSIZE", "4096"))
+        # Comprimir con gzip los cuerpos de embeddings de 1KB o más (el endpoint debe aceptarlo)
+        self.EMBEDDINGS_GZIP_REQUESTS = os.getenv("EMBEDDINGS_GZIP_REQUESTS", "false").lower() in ("true", "1", "t", "yes")
+        # Puntuación lexical mínima para responder sin esperar el embedding
+        # (0 desactiva la búsqueda lexical anticipada)
+        self.SEARCH_LEXICAL_PREFETCH_SCORE = float(os.getenv("SEARCH_LEXICAL_PREFETCH_SCORE", "0"))
 
         # JWT Configuration
         self.JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "")
@@ -189,6 +218,9 @@ class Settings:
         self.POSTGRES_URL = os.getenv("POSTGRES_URL", "")
         self.POSTGRES_POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE", "20"))
         self.POSTGRES_MAX_OVERFLOW = int(os.getenv("POSTGRES_MAX_OVERFLOW", "10"))
+        self.POSTGRES_POOL_TIMEOUT = float(os.getenv("POSTGRES_POOL_TIMEOUT", "10"))
+        # Filas por página al agrupar executemany (INSERT multi-fila / execute_batch)
+        self.POSTGRES_BATCH_PAGE_SIZE = int(os.getenv("POSTGRES_BATCH_PAGE_SIZE", "1000"))
         self.CHECKPOINT_TABLES = ["checkpoint_blobs", "checkpoint_writes", "checkpoints"]
 
         # Derived/Postgres details (parsed from POSTGRES_URL or individual envs)
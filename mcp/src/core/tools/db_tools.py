@@ -55,6 +55,9 @@ def register_db_tools(server: FastMCP) -> None:
             Dict[str, Any]: Resultado con la compra persistida.
         """
         try:
+            # Rechazar tiendas desconocidas antes de parsear y validar los items
+            purchase_service.resolve_table_name(store_id)
+
             # Manejar tanto lista como JSON string
             if isinstance(products, str):
                 try:
@@ -150,20 +153,34 @@ def register_db_tools(server: FastMCP) -> None:
     print("   - register_product_sale: Registra venta")
 
     @server.tool()
-    async def get_store_purchases(store_id: str, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+    async def get_store_purchases(
+        store_id: str,
+        limit: int = 50,
+        offset: int = 0,
+        before_id: Optional[int] = None,
+    ) -> Dict[str, Any]:
         """Obtiene compras de una tienda específica usando su tabla mapeada.
 
+        Para recorrer páginas, pasar como `before_id` el `next_cursor` de la
+        respuesta anterior; es más eficiente que aumentar `offset`.
+
         Args:
             store_id (str): Identificador de la tienda para resolver la tabla.
             limit (int): Límite de registros a recuperar (1-200).
-            offset (int): Desplazamiento de los registros.
+            offset (int): Desplazamiento de los registros (ignorado si hay `before_id`).
+            before_id (Optional[int]): Cursor: solo compras con id menor a este.
 
         Returns:
-            Dict[str, Any]: Resultado con la lista de compras.
+            Dict[str, Any]: Resultado con la lista de compras y `next_cursor`
+            (None si no hay más páginas).
         """
         try:
-            purchases = purchase_service.get_purchases(store_id=store_id, limit=limit, offset=offset)
-            return {"success": True, "purchases": purchases}
+            purchases = purchase_service.get_purchases(
+                store_id=store_id, limit=limit, offset=offset, before_id=before_id
+            )
+            # Página llena: puede haber más compras antes del último id
+            next_cursor = purchases[-1]["id"] if purchases and len(purchases) >= max(1, min(limit, 200)) else None
+            return {"success": True, "purchases": purchases, "next_cursor": next_cursor}
         except PurchaseServiceError as e:
             return {"success": False, "error": e.message, "status_code": e.status_code}
         except Exception as e:
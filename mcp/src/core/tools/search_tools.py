@@ -5,8 +5,9 @@ Este módulo registra herramientas MCP enfocadas exclusivamente en la búsqueda
 productos (por texto vectorial/híbrido y por SKU exacto).
 """
 
+import asyncio
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from mcp.server.fastmcp import FastMCP
 from services.azure_ai_search import (
     get_azure_search_service,
@@ -135,16 +136,25 @@ def register_search_tools(server: FastMCP) -> None:
     async def search_product_by_text(
         query: str,
         store_id: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        category: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Busca productos por texto utilizando búsqueda híbrida y/o vectorial.
 
         Combina nombre y descripción del producto para calcular similitud semántica
-        en un índice de productos. Permite filtrar por `store_id`.
+        en un índice de productos. Permite filtrar por `store_id`, rango de precio,
+        disponibilidad y categoría.
 
         Args:
             query (str): Texto de búsqueda del producto
             store_id (str, optional): Identificador de tienda para filtrar resultados
+            min_price (float, optional): Precio mínimo
+            max_price (float, optional): Precio máximo
+            in_stock (bool, optional): Solo productos con (True) o sin (False) stock
+            category (str, optional): Categoría exacta del producto
 
         Returns:
             dict: Resultados de búsqueda con estructura:
@@ -159,11 +169,31 @@ def register_search_tools(server: FastMCP) -> None:
         try:
             DEFAULT_TOP = 12
             print(f"🛒 Búsqueda de productos por texto: '{query}' | store_id={store_id}")
-            search_service = get_azure_search_service()
 
-            filters: Dict[str, Any] = {}
-            # if store_id:
-            filters["store_id"] = store_id
+            # Rango de precios imposible: no tiene sentido consultar Azure
+            if min_price is not None and max_price is not None and min_price > max_price:
+                return {
+                    "count": 0,
+                    "results": [],
+                    "query": query,
+                    "search_type": "empty_price_range",
+                    "field_used": "product_vector",
+                }
+
+            # Un solo recorrido omitiendo los filtros no provistos; None si no hay ninguno
+            filters = {
+                k: v
+                for k, v in (
+                    ("store_id", store_id),
+                    ("min_price", min_price),
+                    ("max_price", max_price),
+                    ("in_stock", in_stock),
+                    ("category", category),
+                )
+                if v is not None
+            } or None
+
+            search_service = get_azure_search_service()
 
             # Verificar si OpenAI está configurado para búsqueda vectorial
             if not search_service.openai_client:
@@ -172,7 +202,7 @@ def register_search_tools(server: FastMCP) -> None:
                     query=query,
                     top=DEFAULT_TOP,
                     use_hybrid=True,
-                    filters=filters or None,
+                    filters=filters,
                 )
                 docs = result.get("documents", [])
                 simplified = [
@@ -198,7 +228,7 @@ def register_search_tools(server: FastMCP) -> None:
                 query=query,
                 top=DEFAULT_TOP,
                 use_hybrid=True,
-                filters=filters or None,
+                filters=filters,
             )
 
             if result.get("error"):
@@ -301,6 +331,186 @@ def register_search_tools(server: FastMCP) -> None:
                 "error": str(e),
             }
 
+    @server.tool()
+    async def search_product_combined(
+        query: str,
+        sku: Optional[str] = None,
+        store_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Busca productos por texto y, si se indica, por SKU exacto en paralelo.
+
+        Ambas consultas se lanzan de forma concurrente, por lo que la latencia es
+        la de la más lenta y no la suma de ambas. Si el SKU existe, ese producto
+        encabeza los resultados y no se repite entre los resultados por texto.
+
+        Args:
+            query (str): Texto de búsqueda del producto
+            sku (str, optional): Código de referencia exacto a priorizar
+            store_id (str, optional): Identificador de tienda para filtrar la búsqueda por texto
+
+        Returns:
+            dict: Resultados combinados con estructura:
+                {
+                    "count": int,
+                    "results": List[{"name", "sku", "price", "description", "images"}],
+                    "query": str,
+                    "sku_found": bool,
+                    "search_type": str
+                }
+        """
+        try:
+            DEFAULT_TOP = 12
+            print(f"🧩 Búsqueda combinada: '{query}' | sku={sku} | store_id={store_id}")
+            search_service = get_azure_search_service()
+
+            text_task = asyncio.create_task(
+                search_service.search_products_by_text(
+                    query=query,
+                    top=DEFAULT_TOP,
+                    use_hybrid=True,
+                    filters={"store_id": store_id} if store_id else None,
+                )
+            )
+            tasks = [text_task]
+            if sku:
+                tasks.append(asyncio.create_task(search_service.search_product_by_sku(sku=sku)))
+
+            outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+            text_res = outcomes[0]
+            sku_res = outcomes[1] if sku else None
+
+            errors = [
+                str(r) if isinstance(r, Exception) else r["error"]
+                for r in outcomes
+                if isinstance(r, Exception) or r.get("error")
+            ]
+            if len(errors) == len(outcomes):
+                return {
+                    "count": 0,
+                    "results": [],
+                    "query": query,
+                    "sku_found": False,
+                    "search_type": "error",
+                    "error": "; ".join(errors),
+                }
+
+            sku_docs = [] if not isinstance(sku_res, dict) or sku_res.get("error") else sku_res.get("documents", [])[:1]
+            text_docs = [] if isinstance(text_res, Exception) or text_res.get("error") else text_res.get("documents", [])
+
+            seen_skus = {d.get("sku") for d in sku_docs}
+            merged = sku_docs + [d for d in text_docs if d.get("sku") is None or d.get("sku") not in seen_skus]
+            simplified = [
+                {
+                    "name": d.get("name"),
+                    "sku": d.get("sku"),
+                    "price": d.get("price"),
+                    "description": d.get("description"),
+                    "images": d.get("images"),
+                }
+                for d in merged
+            ]
+
+            print(f"✅ Búsqueda combinada: {len(simplified)} productos (sku_found={bool(sku_docs)})")
+            response: Dict[str, Any] = {
+                "count": len(simplified),
+                "results": simplified,
+                "query": query,
+                "sku_found": bool(sku_docs),
+                "search_type": "combined",
+            }
+            if errors:
+                response["warning"] = "; ".join(errors)
+            return response
+
+        except Exception as e:
+            print(f"❌ Error en búsqueda combinada: {str(e)}")
+            return {
+                "count": 0,
+                "results": [],
+                "query": query,
+                "sku_found": False,
+                "search_type": "error",
+                "error": str(e),
+            }
+
+    @server.tool()
+    async def batch_search_products(
+        queries: List[str],
+        store_id: Optional[str] = None,
+        dedupe: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Busca varios productos por texto en una sola llamada.
+
+        Los embeddings de todas las consultas se calculan en una única petición y
+        las búsquedas se ejecutan en paralelo, por lo que resulta más rápido que
+        invocar `search_product_by_text` una vez por consulta.
+
+        Args:
+            queries (List[str]): Textos de búsqueda de productos
+            store_id (str, optional): Identificador de tienda para filtrar resultados
+            dedupe (bool): Si es True, un SKU solo aparece en la primera consulta que lo devuelve
+
+        Returns:
+            dict: Resultados por consulta con estructura:
+                {
+                    "count": int,
+                    "batches": List[{"query", "count", "results", "search_type", "error"?}],
+                    "search_type": str
+                }
+        """
+        try:
+            DEFAULT_TOP = 12
+            print(f"📦 Búsqueda por lotes: {len(queries)} consultas | store_id={store_id}")
+            search_service = get_azure_search_service()
+
+            results = await search_service.batch_search_products(
+                queries=queries,
+                top=DEFAULT_TOP,
+                use_hybrid=True,
+                filters={"store_id": store_id} if store_id else None,
+                dedupe=dedupe,
+            )
+
+            batches = []
+            for query, result in zip(queries, results):
+                simplified = [
+                    {
+                        "name": d.get("name"),
+                        "sku": d.get("sku"),
+                        "price": d.get("price"),
+                        "description": d.get("description"),
+                        "images": d.get("images"),
+                    }
+                    for d in result.get("documents", [])
+                ]
+                entry: Dict[str, Any] = {
+                    "query": query,
+                    "count": len(simplified),
+                    "results": simplified,
+                    "search_type": result.get("search_type", "product_vector"),
+                }
+                if result.get("error"):
+                    entry["error"] = result["error"]
+                batches.append(entry)
+
+            print(f"✅ Búsqueda por lotes completada: {sum(b['count'] for b in batches)} productos")
+            return {
+                "count": sum(b["count"] for b in batches),
+                "batches": batches,
+                "search_type": "batch",
+            }
+
+        except Exception as e:
+            print(f"❌ Error en búsqueda por lotes: {str(e)}")
+            return {
+                "count": 0,
+                "batches": [],
+                "search_type": "error",
+                "error": str(e),
+            }
+
     @server.tool()
     async def list_products_by_store(
         store_id: str,
@@ -416,6 +626,8 @@ def register_search_tools(server: FastMCP) -> None:
     print("🔧 Herramientas de búsqueda registradas en el servidor MCP")
     print("   - search_product_by_text: Búsqueda de productos por texto (product_vector)")
     print("   - search_product_by_sku: Búsqueda de producto por SKU exacto")
+    print("   - search_product_combined: Búsqueda por texto y SKU en paralelo")
+    print("   - batch_search_products: Búsqueda de varias consultas en un solo lote")
     print("   - list_products_by_store: Lista productos por store_id")
     print("   - Las herramientas soportan modo híbrido (texto + vector) donde aplique")
 
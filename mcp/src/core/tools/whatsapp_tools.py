@@ -5,13 +5,14 @@ Registra tres tools:
 - send_whatsapp_image: Envía una imagen por WhatsApp
 - send_whatsapp_audio: Envía un audio por WhatsApp (opcional PTT)
 - send_whatsapp_video: Envía un video por WhatsApp
+- send_whatsapp_batch: Envía varios medios en paralelo
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 from mcp.server.fastmcp import FastMCP
 
-from services import whatsapp_service, WhatsAppServiceError
+from services import whatsapp_service, WhatsAppServiceError, normalize_phone
 
 
 def register_whatsapp_tools(server: FastMCP) -> None:
@@ -39,12 +40,11 @@ def register_whatsapp_tools(server: FastMCP) -> None:
             }
         """
         try:
-            # Validar número de teléfono
-            if not phone.startswith("+"):
-                phone = f"+{phone}"
+            # Validar número de teléfono antes de llamar al servidor
+            phone = normalize_phone(phone)
 
             # Enviar imagen
-            result = whatsapp_service.send_image(
+            result = await whatsapp_service.send_image(
                 phone=phone,
                 image_url=image_url,
                 port=port,
@@ -72,7 +72,9 @@ def register_whatsapp_tools(server: FastMCP) -> None:
             Dict[str, Any]: Respuesta del servidor con estado y datos
         """
         try:
-            result = whatsapp_service.send_audio(
+            phone = normalize_phone(phone)
+
+            result = await whatsapp_service.send_audio(
                 phone=phone,
                 audio_url=audio_url,
                 port=port
@@ -99,7 +101,9 @@ def register_whatsapp_tools(server: FastMCP) -> None:
             Dict[str, Any]: Respuesta del servidor con estado y datos
         """
         try:
-            result = whatsapp_service.send_video(
+            phone = normalize_phone(phone)
+
+            result = await whatsapp_service.send_video(
                 phone=phone,
                 video_url=video_url,
                 port=port,
@@ -127,10 +131,9 @@ def register_whatsapp_tools(server: FastMCP) -> None:
             Dict[str, Any]: Respuesta del servidor con estado y datos
         """
         try:
-            if not phone.startswith("+"):
-                phone = f"+{phone}"
+            phone = normalize_phone(phone)
 
-            result = whatsapp_service.send_pdf(
+            result = await whatsapp_service.send_pdf(
                 phone=phone,
                 pdf_url=pdf_url,
                 port=port,
@@ -142,4 +145,24 @@ def register_whatsapp_tools(server: FastMCP) -> None:
         except Exception as e:
             return {"status": "error", "message": str(e), "status_code": 500}
 
+    @server.tool()
+    async def send_whatsapp_batch(messages: List[Dict[str, Any]], port: int = 3001) -> Dict[str, Any]:
+        """
+        Envía varios medios por WhatsApp en paralelo.
 
+        Args:
+            messages (List[Dict[str, Any]]): Mensajes con `type` ("image", "audio",
+                "video" o "pdf"), `phone`, `url` y `caption` opcional
+            port (int): Puerto del servidor WhatsApp a usar (por defecto 3001)
+
+        Returns:
+            Dict[str, Any]: Resultado por mensaje, en el mismo orden de entrada
+        """
+        results = await whatsapp_service.send_many(messages, port=port)
+        failed = sum(1 for r in results if r["status"] != "success")
+        return {
+            "status": "success" if not failed else "partial" if failed < len(results) else "error",
+            "sent": len(results) - failed,
+            "failed": failed,
+            "results": results,
+        }
@@ -13,9 +13,12 @@ from typing import (
 from contextlib import contextmanager
 import logging
 
+import orjson
+
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.pool import QueuePool
 from sqlalchemy import text  # <-- Agregado para consultas SQL directas
+from sqlalchemy.engine import make_url
 from sqlmodel import (
     Session,
     SQLModel,
@@ -29,6 +32,11 @@ from core.config import (
 logger = logging.getLogger("database")
 
 
+def _json_serializer(value: Any) -> str:
+    """Serializa columnas JSON/JSONB con orjson; SQLAlchemy espera `str`, no `bytes`."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 class DatabaseError(Exception):
     """
     Excepción personalizada para errores de base de datos.
@@ -95,16 +103,35 @@ class DatabaseService:
                     "poolclass": QueuePool,
                     "pool_size": settings.POSTGRES_POOL_SIZE,
                     "max_overflow": settings.POSTGRES_MAX_OVERFLOW,
+                    "pool_timeout": settings.POSTGRES_POOL_TIMEOUT,
                     "pool_recycle": 3600,
+                    # LIFO mantiene calientes las conexiones recientes y deja
+                    # que las ociosas expiren del lado de Postgres
+                    "pool_use_lifo": True,
+                    "pool_reset_on_return": "rollback",
                 }
+                if make_url(db_url).get_driver_name() == "psycopg2":
+                    # Equivalente a reWriteBatchedInserts: los executemany de INSERT se
+                    # reescriben como VALUES multi-fila y los UPDATE/DELETE se agrupan
+                    # con execute_batch, en páginas en lugar de un round-trip por fila
+                    engine_kwargs.update(
+                        executemany_mode="values_plus_batch",
+                        insertmanyvalues_page_size=settings.POSTGRES_BATCH_PAGE_SIZE,
+                        executemany_batch_page_size=settings.POSTGRES_BATCH_PAGE_SIZE,
+                    )
+
+            # JSON/JSONB se codifica y decodifica con orjson en lugar de json
+            engine_kwargs["json_serializer"] = _json_serializer
+            engine_kwargs["json_deserializer"] = orjson.loads
 
             # Crear el engine con la URL determinada
             self.engine = create_engine(db_url, **engine_kwargs)
             
             logger.info(
-                "database_engine_initialized pool_size=%s max_overflow=%s",
+                "database_engine_initialized pool_size=%s max_overflow=%s pool_timeout=%s",
                 settings.POSTGRES_POOL_SIZE,
                 settings.POSTGRES_MAX_OVERFLOW,
+                settings.POSTGRES_POOL_TIMEOUT,
             )
 
         except Exception as e:
@@ -219,6 +246,25 @@ class DatabaseService:
             logger.exception("database_health_check_failed: %s", str(e))
             return False
 
+    def pool_status(self) -> dict:
+        """
+        Retorna métricas del pool de conexiones para monitoreo.
+
+        Returns:
+            dict: Tamaño, conexiones en uso, ociosas y overflow del pool.
+                Vacío si el engine no usa QueuePool (p. ej., SQLite).
+        """
+        pool = self.engine.pool if self.engine else None
+        if not isinstance(pool, QueuePool):
+            return {}
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "status": pool.status(),
+        }
+
     def close_connections(self) -> None:
         """
         Cierra todas las conexiones del pool.
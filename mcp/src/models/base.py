@@ -6,11 +6,24 @@ de la aplicación, proporcionando campos y funcionalidades comunes.
 """
 
 from datetime import datetime, UTC
-from typing import Optional
+from typing import Any, ClassVar, Optional
+from pydantic import ConfigDict
 from sqlmodel import Field, SQLModel
 from uuid import UUID, uuid4
 
 
+class _AttrView:
+    """Vista de atributos para `str.format_map` (resuelve campos expirados de SQLAlchemy)."""
+
+    __slots__ = ("_obj",)
+
+    def __init__(self, obj: Any):
+        self._obj = obj
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self._obj, key)
+
+
 class BaseModel(SQLModel):
     """
     Modelo base con campos comunes para todos los modelos.
@@ -29,6 +42,26 @@ class BaseModel(SQLModel):
         description="Fecha y hora de última actualización del registro"
     )
     
+    # Plantilla de `__repr__` precompilada; cada modelo define la suya
+    _REPR_FMT: ClassVar[Optional[str]] = None
+
+    @classmethod
+    def from_db_row(cls, row: Any):
+        """
+        Hidrata una instancia desde una fila ya persistida, sin validadores.
+        
+        En modelos `table=True` el constructor de SQLModel no ejecuta la
+        validación de Pydantic, por lo que basta con él; `model_construct`
+        no sirve aquí porque omite el estado de instrumentación de SQLAlchemy.
+        
+        Args:
+            row: `Row` de SQLAlchemy o mapeo columna -> valor
+            
+        Returns:
+            Instancia del modelo con los valores de la fila
+        """
+        return cls(**getattr(row, "_mapping", row))
+
     def update_timestamp(self) -> None:
         """
         Actualiza el timestamp de modificación.
@@ -38,9 +71,25 @@ class BaseModel(SQLModel):
         """
         self.updated_at = datetime.now(UTC)
     
-    class Config:
-        """Configuración del modelo base."""
-        json_encoders = {
+    def __repr__(self) -> str:
+        """
+        Representación string del registro a partir de `_REPR_FMT`.
+        
+        Returns:
+            str: Representación del registro
+        """
+        fmt = type(self)._REPR_FMT
+        if fmt is None:
+            return super().__repr__()
+        return fmt.format_map(_AttrView(self))
+    
+    # Configuración del modelo base: el esquema de validación se construye en
+    # el primer uso, no al importar (p. ej. scripts que nunca instancian modelos)
+    model_config = ConfigDict(
+        defer_build=True,
+        validate_assignment=False,
+        json_encoders={
             datetime: lambda v: v.isoformat(),
             UUID: lambda v: str(v)
-        }
+        },
+    )
@@ -9,7 +9,10 @@ from datetime import datetime
 from enum import Enum
 from typing import Any, Dict, Optional
 
-from sqlalchemy import Column, DateTime, Enum as SQLEnum, Integer, String, Text, JSON
+from sqlalchemy import CHAR, Column, DateTime, Integer, String, Text, JSON
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.sql import func
+from pydantic import ConfigDict
 from sqlmodel import Field, SQLModel
 
 
@@ -23,6 +26,32 @@ class LogLevel(str, Enum):
     CRITICAL = "CRITICAL"
 
 
+class LevelCode(TypeDecorator):
+    """Almacena `LogLevel` como un código de un carácter ('D', 'I', 'W', 'E', 'C')."""
+
+    impl = CHAR(1)
+    cache_ok = True
+
+    _to = {
+        "DEBUG": "D",
+        "INFO": "I",
+        "WARNING": "W",
+        "ERROR": "E",
+        "CRITICAL": "C",
+    }
+    _from = {v: k for k, v in _to.items()}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self._to[value.value if isinstance(value, LogLevel) else value]
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return LogLevel(self._from[value])
+
+
 class Log(SQLModel, table=True):
     """
     Modelo para almacenar logs en la base de datos.
@@ -35,7 +64,7 @@ class Log(SQLModel, table=True):
     
     # Campos principales
     id: Optional[int] = Field(default=None, primary_key=True)
-    level: LogLevel = Field(sa_column=Column(SQLEnum(LogLevel), nullable=False))
+    level: LogLevel = Field(sa_column=Column(LevelCode(), nullable=False))
     message: str = Field(sa_column=Column(Text, nullable=False))
     module: Optional[str] = Field(sa_column=Column(String(255), nullable=True))
     function_name: Optional[str] = Field(sa_column=Column(String(255), nullable=True))
@@ -45,12 +74,11 @@ class Log(SQLModel, table=True):
     session_id: Optional[str] = Field(sa_column=Column(String(255), nullable=True))
     additional_data: Optional[Dict[str, Any]] = Field(sa_column=Column(JSON, nullable=True))
     
-    # Campos de timestamp
-    created_at: datetime = Field(
-        default_factory=datetime.utcnow,
-        sa_column=Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Campos de timestamp (asignado por la base de datos al insertar)
+    created_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     )
     
-    class Config:
-        """Configuración del modelo."""
-        arbitrary_types_allowed = True 
\ No newline at end of file
+    # Configuración del modelo
+    model_config = ConfigDict(arbitrary_types_allowed=True) 
\ No newline at end of file
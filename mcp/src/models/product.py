@@ -5,11 +5,16 @@ Este módulo define el modelo de producto para un contexto de
 venta minorista/comercial, con soporte para SKU y stock.
 """
 
+import math
+from typing import ClassVar, Dict, List, Sequence, Tuple
+from sqlalchemy import text
 from sqlmodel import Field
-from pydantic import validator
-from decimal import Decimal
+from pydantic import field_validator
 from .base import BaseModel
 
+# Tabla de mayúsculas ASCII para SKUs (evita el casefolding Unicode de str.upper)
+_ASCII_UPPER = bytes.maketrans(b'abcdefghijklmnopqrstuvwxyz', b'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
 
 class Product(BaseModel, table=True):
     """
@@ -25,6 +30,7 @@ class Product(BaseModel, table=True):
     """
     
     __tablename__ = "products"
+    _REPR_FMT: ClassVar[str] = "<Product(name='{name}', sku='{sku}', price={price}, stock={stock_quantity})>"
     
     name: str = Field(
         min_length=2,
@@ -58,7 +64,8 @@ class Product(BaseModel, table=True):
         description="Indica si el producto está activo para la venta"
     )
 
-    @validator('price')
+    @field_validator('price')
+    @classmethod
     def validate_price(cls, v):
         """
         Valida que el precio sea positivo y tenga máximo 2 decimales.
@@ -75,14 +82,17 @@ class Product(BaseModel, table=True):
         if v <= 0:
             raise ValueError('El precio debe ser mayor a 0')
         
-        # Verificar que tenga máximo 2 decimales
-        decimal_price = Decimal(str(v))
-        if decimal_price.as_tuple().exponent < -2:
+        # Verificar que tenga máximo 2 decimales trabajando en centavos enteros
+        scaled = float(v) * 100
+        cents = round(scaled)
+        # Tolerancia relativa: en montos grandes el error de `v * 100` supera 1e-6
+        if not math.isclose(scaled, cents, rel_tol=1e-9, abs_tol=1e-6):
             raise ValueError('El precio debe tener máximo 2 decimales')
         
-        return float(decimal_price.quantize(Decimal('0.01')))
+        return cents / 100.0
 
-    @validator('name')
+    @field_validator('name')
+    @classmethod
     def validate_name(cls, v):
         """
         Valida y normaliza el nombre del producto.
@@ -93,23 +103,31 @@ class Product(BaseModel, table=True):
         Returns:
             str: Nombre validado y normalizado
         """
-        return v.strip().title()
+        v = v.strip()
+        # Evita re-titular (y asignar una cadena nueva) si ya viene normalizado
+        return v if v.istitle() else v.title()
 
-    @validator('sku')
-    def validate_sku(cls, v):
+    @field_validator('sku', mode='before')
+    @classmethod
+    def normalize_sku(cls, v):
         """
-        Valida y normaliza el SKU.
+        Normaliza el SKU antes de validarlo.
+        
+        La longitud mínima la verifica `min_length` sobre el valor ya
+        normalizado, sin callback adicional.
         
         Args:
-            v: SKU a validar
+            v: SKU a normalizar
         
         Returns:
-            str: SKU normalizado
+            str: SKU sin espacios extremos y en mayúsculas
         """
-        normalized = v.strip().upper()
-        if len(normalized) < 3:
-            raise ValueError('El SKU debe tener al menos 3 caracteres')
-        return normalized
+        if not isinstance(v, str):
+            return v
+        normalized = v.strip()
+        if normalized.isascii():
+            return normalized.encode('ascii').translate(_ASCII_UPPER).decode('ascii')
+        return normalized.upper()
 
 
     def is_in_stock(self) -> bool:
@@ -128,9 +146,7 @@ class Product(BaseModel, table=True):
         Returns:
             bool: True si está activo y hay stock
         """
-        if not self.is_active:
-            return False
-        return self.is_in_stock()
+        return self.is_active and self.stock_quantity > 0
 
     def decrease_stock(self, quantity: int) -> None:
         """
@@ -149,6 +165,51 @@ class Product(BaseModel, table=True):
         self.stock_quantity -= quantity
         self.update_timestamp()
 
+    @classmethod
+    def bulk_decrease_stock(cls, engine, decrements: Sequence[Tuple[int, int]]) -> List[int]:
+        """
+        Disminuye el stock de varios productos en un único UPDATE.
+        
+        Solo se actualizan las filas con stock suficiente; el llamador compara
+        los ids retornados con los solicitados para detectar faltantes. Si un
+        id aparece varias veces, sus cantidades se suman y se descuentan (y se
+        verifican contra el stock) como una sola línea.
+        
+        Args:
+            engine: Engine de SQLAlchemy (PostgreSQL: usa UPDATE ... FROM VALUES)
+            decrements: Pares (id del producto, cantidad a disminuir)
+        
+        Returns:
+            List[int]: Ids de los productos actualizados
+        
+        Raises:
+            ValueError: Si alguna cantidad es inválida
+        """
+        if not decrements:
+            return []
+        # UPDATE ... FROM actualiza cada fila una sola vez: agrupar por id
+        totals: Dict[int, int] = {}
+        for product_id, quantity in decrements:
+            if quantity <= 0:
+                raise ValueError('La cantidad a disminuir debe ser mayor a 0')
+            key = int(product_id)
+            totals[key] = totals.get(key, 0) + int(quantity)
+        params = {}
+        rows = []
+        for i, (product_id, quantity) in enumerate(totals.items()):
+            params[f"id{i}"] = product_id
+            params[f"q{i}"] = quantity
+            rows.append(f"(:id{i}, :q{i})")
+        stmt = text(
+            f"UPDATE {cls.__tablename__} AS p "
+            "SET stock_quantity = p.stock_quantity - d.q, updated_at = NOW() "
+            f"FROM (VALUES {', '.join(rows)}) AS d(id, q) "
+            "WHERE p.id = d.id AND p.stock_quantity >= d.q "
+            "RETURNING p.id"
+        )
+        with engine.begin() as conn:
+            return [row[0] for row in conn.execute(stmt, params)]
+
     def increase_stock(self, quantity: int) -> None:
         """
         Aumenta el stock del producto.
@@ -164,18 +225,6 @@ class Product(BaseModel, table=True):
         self.stock_quantity += quantity
         self.update_timestamp()
 
-    def __repr__(self) -> str:
-        """
-        Representación string del producto.
-        
-        Returns:
-            str: Representación del producto
-        """
-        return (
-            f"<Product(name='{self.name}', sku='{self.sku}', price={self.price}, "
-            f"stock={self.stock_quantity})>"
-        )
-
     # Métodos relacionados con costos internos y dropshipping fueron removidos.
 
     # No se manejan impuestos en este modelo simplificado.
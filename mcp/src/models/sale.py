@@ -1,14 +1,19 @@
 """
 Modelo de ventas por producto.
 
-Este módulo define la tabla para registrar ventas por producto,
-incluyendo la dirección del cliente y datos de precio/cantidad.
+Este módulo define la tabla para registrar ventas por producto. Es la
+definición canónica del esquema que usa `services.purchase_service` al
+leer y escribir compras (teléfono, total, productos y datos del cliente).
 """
 
-from decimal import Decimal
-from typing import Dict, Any, Optional
-from sqlmodel import Field, Column, JSON
-from pydantic import validator
+import math
+from datetime import datetime, UTC
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Any, ClassVar, Iterable, List
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Field, Column
+from pydantic import field_validator
 
 from .base import BaseModel
 
@@ -18,30 +23,33 @@ class ProductSale(BaseModel, table=True):
     Modelo para la tabla de ventas por producto.
 
     Attributes:
-        customer_phone: Teléfono del cliente
+        client_phone: Teléfono del cliente
         total_amount: Total de la venta
-        customer_address: Dirección del cliente
-        products: Información JSON de los productos vendidos
+        products: Items vendidos (`product_id`, `quantity`, `unit_price`)
+        client_json: Datos del cliente (dirección, ciudad, cédula, nombre, celular, correo)
     """
 
     __tablename__ = "ventas_mauricio"
+    _REPR_FMT: ClassVar[str] = "<ProductSale(id={id}, phone={client_phone}, total={total_amount})>"
 
-    customer_phone: str = Field(
+    client_phone: str = Field(
+        max_length=30,
         description="Teléfono del cliente"
     )
     total_amount: float = Field(
         description="Total de la venta"
     )
-    customer_address: str = Field(
-        description="Dirección del cliente"
-    )
-    products: Optional[Dict[str, Any]] = Field(
-        default=None,
-        sa_column=Column(JSON),
+    products: List[Dict[str, Any]] = Field(
+        sa_column=Column(JSONB, nullable=False),
         description="Información JSON de los productos vendidos"
     )
+    client_json: Dict[str, Any] = Field(
+        sa_column=Column(JSONB, nullable=False),
+        description="Información JSON del cliente"
+    )
 
-    @validator('total_amount')
+    @field_validator('total_amount')
+    @classmethod
     def validate_price_fields(cls, v):
         """
         Valida que el campo de precio tenga máximo 2 decimales.
@@ -52,21 +60,70 @@ class ProductSale(BaseModel, table=True):
         Returns:
             float: Valor con dos decimales
         """
-        decimal_value = Decimal(str(v))
-        if decimal_value.as_tuple().exponent < -2:
+        # Verificación en centavos enteros, sin crear objetos Decimal
+        scaled = float(v) * 100
+        cents = round(scaled)
+        # Tolerancia relativa: en montos grandes el error de `v * 100` supera 1e-6
+        if not math.isclose(scaled, cents, rel_tol=1e-9, abs_tol=1e-6):
             raise ValueError('Los valores monetarios deben tener máximo 2 decimales')
-        return float(decimal_value.quantize(Decimal('0.01')))
+        return cents / 100.0
+
+    def calculate_total(self, strict: bool = False) -> float:
+        """
+        Calcula el total de la venta a partir de los items en `products`.
+
+        Cada precio unitario se lleva a centavos enteros y se multiplica por
+        la cantidad, sin crear objetos Decimal.
+
+        Args:
+            strict: Si es True, usa Decimal con redondeo ROUND_HALF_UP
+
+        Returns:
+            float: Suma de `quantity * unit_price` con dos decimales
+        """
+        items = self.products or []
+        if strict:
+            total = sum(
+                (Decimal(str(item.get("quantity", 0))) * Decimal(str(item.get("unit_price", 0))) for item in items),
+                Decimal("0"),
+            )
+            return float(total.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+
+        cents = sum(int(item.get("quantity", 0)) * round(float(item.get("unit_price", 0)) * 100) for item in items)
+        return cents / 100.0
+
+    def update_total(self) -> None:
+        """
+        Recalcula `total_amount` desde los items y actualiza el timestamp.
+        """
+        self.total_amount = self.calculate_total()
+        self.update_timestamp()
 
-    def __repr__(self) -> str:
+    @classmethod
+    def bulk_insert(cls, engine, rows: Iterable[Dict[str, Any]]) -> int:
         """
-        Representación string de la venta por producto.
+        Inserta ventas en bloque con SQLAlchemy Core, sin pasar por el ORM.
+
+        Pensado para importaciones ya validadas: no se ejecutan los
+        validadores de Pydantic, por lo que los montos deben venir
+        redondeados a centavos. Si una fila no trae `created_at` o
+        `updated_at`, se usa un único timestamp para todo el lote.
+
+        Args:
+            engine: Engine de SQLAlchemy
+            rows: Diccionarios con las columnas de la tabla
 
         Returns:
-            str: Representación de la venta
+            int: Número de filas insertadas
         """
-        return (
-            f"<ProductSale(id={self.id}, phone={self.customer_phone}, "
-            f"total={self.total_amount}, address={self.customer_address[:20]}...)>"
-        )
+        now = datetime.now(UTC)
+        stamps = {"created_at": now, "updated_at": now}
+        payload = [{**stamps, **row} for row in rows]
+        if not payload:
+            return 0
+        with engine.begin() as conn:
+            conn.execute(insert(cls.__table__), payload)
+        return len(payload)
+
 
 
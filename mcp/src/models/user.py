@@ -5,10 +5,10 @@ Este módulo contiene el modelo de usuario que gestiona
 las cuentas de usuarios del sistema de restaurante.
 """
 
-from typing import List, Optional
+from typing import ClassVar, List, Optional
 from sqlmodel import Field, Relationship
 from sqlalchemy import Column, JSON
-from pydantic import validator
+from pydantic import field_validator
 from .base import BaseModel
 
 
@@ -24,6 +24,7 @@ class User(BaseModel, table=True):
     """
     
     __tablename__ = "users"
+    _REPR_FMT: ClassVar[str] = "<User(name='{name}', phone='{phone}')>"
 
     name: str = Field(
         min_length=2, 
@@ -36,11 +37,14 @@ class User(BaseModel, table=True):
         index=True,
         min_length=10,
         max_length=15,
+        # El patrón lo evalúa pydantic-core; SQLModel 0.0.14 ignora `regex=` con Pydantic v2
+        schema_extra={"pattern": r'^\d{10,15}$'},
         description="Número de teléfono del usuario"
     )
     email: Optional[str] = Field(
         default=None,
         max_length=255,
+        schema_extra={"pattern": r'^[^@\s]+@[^@\s]+\.[^@\s]+$'},
         description="Correo electrónico del usuario"
     )
     is_active: bool = Field(
@@ -54,45 +58,19 @@ class User(BaseModel, table=True):
     )
 
 
-    @validator('phone')
-    def validate_phone(cls, v):
+    @field_validator('email', mode='before')
+    @classmethod
+    def normalize_email(cls, v):
         """
-        Valida el formato del número de teléfono.
+        Normaliza el correo a minúsculas antes de validar su formato.
         
         Args:
-            v: Valor del teléfono a validar
+            v: Valor del email
             
         Returns:
-            str: Teléfono validado
-            
-        Raises:
-            ValueError: Si el formato del teléfono es inválido
-        """
-        if not v.isdigit():
-            raise ValueError('El teléfono debe contener solo números')
-        if len(v) < 10:
-            raise ValueError('El teléfono debe tener al menos 10 dígitos')
-        return v
-
-    @validator('email')
-    def validate_email(cls, v):
-        """
-        Valida el formato del correo electrónico.
-        
-        Args:
-            v: Valor del email a validar
-            
-        Returns:
-            str: Email validado o None
-            
-        Raises:
-            ValueError: Si el formato del email es inválido
+            str: Email en minúsculas o None
         """
-        if v is None:
-            return v
-        if '@' not in v or '.' not in v:
-            raise ValueError('Formato de email inválido')
-        return v.lower()
+        return v.lower() if isinstance(v, str) else v
 
     def get_name_and_email(self) -> dict:
         """
@@ -105,12 +83,3 @@ class User(BaseModel, table=True):
             "name": self.name,
             "email": self.email
         }
-
-    def __repr__(self) -> str:
-        """
-        Representación string del usuario.
-        
-        Returns:
-            str: Representación del usuario
-        """
-        return f"<User(name='{self.name}', phone='{self.phone}')>"
@@ -1,44 +1,69 @@
-import psycopg2
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from typing import Optional
+
+from psycopg2.pool import ThreadedConnectionPool
 
 from core.config import settings
 
 
+# Pool perezoso hacia la base de administración del servidor; se reutiliza
+# entre llamadas para no repetir el handshake TCP/TLS/auth en cada reintento
+_pool: Optional[ThreadedConnectionPool] = None
+
+
+def _get_pool() -> ThreadedConnectionPool:
+    """Retorna el pool de conexiones al servidor, creándolo en el primer uso."""
+    global _pool
+    if _pool is None or _pool.closed:
+        # Configuración de conexión al servidor PostgreSQL (no a una base de datos específica)
+        db_config = {
+            'host': settings.DB_HOST,
+            'port': settings.DB_PORT,
+            'user': settings.DB_USER,
+            'password': settings.DB_PASSWORD,
+            'dbname': settings.DB_SERVER_DB,
+        }
+        _pool = ThreadedConnectionPool(1, 4, **db_config)
+    return _pool
+
+
+def close_pool() -> None:
+    """Cierra todas las conexiones del pool."""
+    global _pool
+    if _pool is not None:
+        _pool.closeall()
+        _pool = None
+
+
 def create_database():
     """
     Crea la base de datos en el servidor PostgreSQL especificado.
     Si la base de datos ya existe, no realiza ninguna acción.
     """
-    # Configuración de conexión al servidor PostgreSQL (no a una base de datos específica)
-    db_config = {
-        'host': settings.DB_HOST,
-        'port': settings.DB_PORT,
-        'user': settings.DB_USER,
-        'password': settings.DB_PASSWORD,
-        'dbname': settings.DB_SERVER_DB,
-    }
-
     try:
-        # Conexión al servidor PostgreSQL
-        connection = psycopg2.connect(**db_config)
-        connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-        cursor = connection.cursor()
-
-        # Verificar si la base de datos ya existe
-        cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s;", (settings.DB_NAME,))
-        exists = cursor.fetchone()
-        if exists:
-            print(f"La base de datos '{settings.DB_NAME}' ya existe.")
-        else:
-            # Crear la base de datos
-            cursor.execute(f'CREATE DATABASE "{settings.DB_NAME}";')
-            print(f"Base de datos '{settings.DB_NAME}' creada exitosamente.")
-
-        cursor.close()
-        connection.close()
+        pool = _get_pool()
+        connection = pool.getconn()
+        try:
+            # CREATE DATABASE no puede ejecutarse dentro de una transacción
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                # Verificar si la base de datos ya existe
+                cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s;", (settings.DB_NAME,))
+                exists = cursor.fetchone()
+                if exists:
+                    print(f"La base de datos '{settings.DB_NAME}' ya existe.")
+                else:
+                    # Crear la base de datos
+                    cursor.execute(f'CREATE DATABASE "{settings.DB_NAME}";')
+                    print(f"Base de datos '{settings.DB_NAME}' creada exitosamente.")
+        finally:
+            # Una conexión caída se descarta en lugar de devolverla al pool
+            pool.putconn(connection, close=bool(connection.closed))
     except Exception as e:
         print(f"Error al crear la base de datos: {e}")
 
 
 if __name__ == "__main__":
-    create_database() 
\ No newline at end of file
+    try:
+        create_database()
+    finally:
+        close_pool()
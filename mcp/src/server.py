@@ -10,14 +10,18 @@ Este servidor proporciona diferentes herramientas de busqueda de información en
 import sys
 from pathlib import Path
 
-current_file = Path(__file__).resolve()
-project_root = current_file.parent.parent.parent.parent.parent.parent
-print(project_root)
-sys.path.insert(0, str(project_root))
+# Raíz del despliegue; se agrega al final para que stdlib y site-packages se resuelvan primero
+# (`parents` no se satura en "/" como `.parent`, por eso se acota el índice)
+_parents = Path(__file__).resolve().parents
+project_root = str(_parents[min(5, len(_parents) - 1)])
+if project_root not in sys.path:
+    sys.path.append(project_root)
 
+import asyncio
 import json
 import random
 from typing import Optional
+import anyio
 from mcp.server.fastmcp import FastMCP
 from datetime import datetime
 # Imports de autenticación comentados temporalmente
@@ -27,27 +31,47 @@ from datetime import datetime
 # from pydantic import AnyHttpUrl
 
 # Configurar logging para filtrar logs de librerías externas
+import atexit
 import logging
+import logging.config
+import logging.handlers
+import queue
 
-# Configurar el nivel de logging para las librerías externas
-logging.getLogger("azure").setLevel(logging.WARNING)
-logging.getLogger("azure.core").setLevel(logging.WARNING)
-logging.getLogger("azure.search").setLevel(logging.WARNING)
-logging.getLogger("azure.search.documents").setLevel(logging.WARNING)
-logging.getLogger("azure.search.documents.indexes").setLevel(logging.WARNING)
-logging.getLogger("openai").setLevel(logging.WARNING)
-logging.getLogger("httpx").setLevel(logging.WARNING)
-logging.getLogger("uvicorn").setLevel(logging.WARNING)
-logging.getLogger("fastapi").setLevel(logging.WARNING)
-
-# Configurar logging solo para tu aplicación
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
+# Configuración única: niveles de librerías externas + handler de la aplicación
+logging.config.dictConfig({
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "std": {"format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"},
+    },
+    "handlers": {
+        "default": {"class": "logging.StreamHandler", "formatter": "std"},
+    },
+    "loggers": {
+        name: {"level": "WARNING"}
+        for name in (
+            "azure",
+            "azure.core",
+            "azure.search",
+            "azure.search.documents",
+            "azure.search.documents.indexes",
+            "openai",
+            "httpx",
+            "uvicorn",
+            "fastapi",
+        )
+    },
+    "root": {"level": "INFO", "handlers": ["default"]},
+})
+
+# Las peticiones solo encolan el registro; un hilo aparte formatea y escribe,
+# de modo que el I/O de logging no bloquea el event loop
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, *logging.root.handlers, respect_handler_level=True)
+logging.root.handlers = [logging.handlers.QueueHandler(_log_queue)]
+_log_listener.start()
+# Vacía la cola al salir, también cuando se ejecuta vía `mcp run`
+atexit.register(_log_listener.stop)
 
 # Logger principal de la aplicación
 logger = logging.getLogger("colombiang-mcp")
@@ -113,9 +137,24 @@ register_whatsapp_tools(server)
 # Las herramientas ahora están organizadas en módulos separados
 # y se registran automáticamente arriba
 
+from services import whatsapp_service
+from services.azure_ai_search import aclose_http_client, warm_up_http_client
+
+
+async def _serve() -> None:
+    """Ejecuta el servidor y cierra los clientes HTTP compartidos al apagarse."""
+    # Pre-abre las conexiones a Azure en segundo plano sin retrasar el arranque
+    warmup = asyncio.create_task(warm_up_http_client())
+    try:
+        await server.run_streamable_http_async()
+    finally:
+        warmup.cancel()
+        await aclose_http_client()
+        await whatsapp_service.aclose()
+
 
 if __name__ == "__main__":
-    server.run(transport="streamable-http")
+    anyio.run(_serve)
     
     
 # Para Levantar inspector en local:
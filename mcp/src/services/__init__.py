@@ -10,6 +10,7 @@ from .whatsapp_service import (
     WhatsAppConfig,
     WhatsAppService,
     whatsapp_service,
+    normalize_phone,
 )
 from .purchase_service import (
     PurchaseServiceError,
@@ -20,6 +21,7 @@ from .azure_ai_search import (
     AzureAISearchService,
     AzureSearchConfig,
     get_azure_search_service,
+    invalidate_sku_cache,
 )
 
 __all__ = [
@@ -27,12 +29,14 @@ __all__ = [
     "WhatsAppConfig",
     "WhatsAppService",
     "whatsapp_service",
+    "normalize_phone",
     "PurchaseServiceError",
     "PurchaseService",
     "purchase_service",
     "AzureAISearchService",
     "AzureSearchConfig",
     "get_azure_search_service",
+    "invalidate_sku_cache",
 ]
 
 
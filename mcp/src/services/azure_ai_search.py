@@ -9,13 +9,436 @@ Las funciones retornan estructuras controladas o errores descriptivos.
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, List, Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, List, Tuple
+from urllib.parse import quote
 
-import json
+import asyncio
+import functools
+import gzip
+import hashlib
 import httpx
+import orjson
+from cachetools import TTLCache
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
 from core.config import settings
 
+if TYPE_CHECKING:
+    # NumPy se importa al recibir el primer embedding (~80ms de arranque menos)
+    import numpy as np
+
+
+# Los vectores float32 se serializan directamente desde NumPy al enviar el payload
+_dumps = functools.partial(orjson.dumps, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+# Por debajo de este tamaño la compresión no compensa la cabecera gzip
+_GZIP_MIN_BYTES = 1024
+
+# Tiempo máximo por host al pre-abrir conexiones en el arranque
+_WARMUP_TIMEOUT_SECONDS = 5.0
+
+# Cliente HTTP compartido por proceso: reutiliza conexiones keep-alive (DNS/TLS)
+# hacia Azure Search y Azure OpenAI en lugar de abrir un cliente por petición.
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Retorna el cliente HTTP compartido, creándolo en el primer uso."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(settings.AZURE_HTTP_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.AZURE_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AZURE_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=60,
+            ),
+        )
+    return _http_client
+
+
+async def aclose_http_client() -> None:
+    """Cierra el cliente HTTP compartido. Debe llamarse al apagar el servidor MCP."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def warm_up_http_client() -> None:
+    """Abre por adelantado las conexiones HTTP/2 hacia Azure Search y el proveedor de embeddings.
+
+    Solo establece TCP/TLS con cada host (la respuesta, normalmente 401/404, se
+    descarta) para que la primera búsqueda real no pague el handshake. Los
+    fallos se ignoran: el calentamiento es opcional.
+    """
+    hosts = []
+    if settings.AZURE_SEARCH_ENDPOINT:
+        hosts.append(settings.AZURE_SEARCH_ENDPOINT.rstrip("/"))
+    elif settings.AZURE_SEARCH_SERVICE_NAME:
+        hosts.append(f"https://{settings.AZURE_SEARCH_SERVICE_NAME}.search.windows.net")
+    if settings.AZURE_OPENAI_ENDPOINT and settings.AZURE_OPENAI_API_KEY:
+        hosts.append(settings.AZURE_OPENAI_ENDPOINT.rstrip("/"))
+    elif settings.OPENAI_API_KEY or settings.LLM_API_KEY:
+        hosts.append(settings.OPENAI_BASE_URL.rstrip("/"))
+
+    client = _get_http_client()
+    await asyncio.gather(
+        *(client.head(host, timeout=_WARMUP_TIMEOUT_SECONDS) for host in hosts),
+        return_exceptions=True,
+    )
+
+
+# Azure Search (503) y Azure OpenAI (429) limitan ante ráfagas; se reintenta con
+# backoff y jitter, y se acota la concurrencia de peticiones salientes
+_RETRY_STATUS = frozenset({429, 503})
+_RETRY_ATTEMPTS = 3
+_RETRY_AFTER_MAX_SECONDS = 5.0
+_backoff = wait_random_exponential(multiplier=0.2, max=2)
+_request_slots = asyncio.Semaphore(settings.AZURE_HTTP_MAX_CONCURRENCY)
+
+
+class _RetryableStatus(Exception):
+    """Respuesta transitoria (429/503) de Azure que amerita reintento."""
+
+    def __init__(self, response: httpx.Response):
+        self.response = response
+        super().__init__(f"Azure {response.status_code}")
+
+
+def _retry_wait(retry_state) -> float:
+    """Respeta `Retry-After` si el servicio lo envía; si no, backoff exponencial."""
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, _RetryableStatus):
+        retry_after = exc.response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), _RETRY_AFTER_MAX_SECONDS)
+            except ValueError:
+                pass
+    return _backoff(retry_state)
+
+
+async def _request_with_retry(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """Envía una petición a Azure Search/OpenAI reintentando ante 429/503 y fallos de red.
+
+    Cada intento ocupa un cupo del semáforo solo mientras dura la petición, no
+    durante la espera del backoff. Si se agotan los intentos retorna la última
+    respuesta para que el llamador la reporte como error, igual que cualquier
+    otro código >= 400; un error de red persistente se propaga.
+    """
+
+    async def _attempt() -> httpx.Response:
+        async with _request_slots:
+            resp = await _get_http_client().request(method, url, **kwargs)
+        if resp.status_code in _RETRY_STATUS:
+            raise _RetryableStatus(resp)
+        return resp
+
+    try:
+        return await _retrying()(_attempt)
+    except _RetryableStatus as e:
+        return e.response
+
+
+def _retrying() -> AsyncRetrying:
+    """Política de reintentos compartida por las peticiones a Azure."""
+    return AsyncRetrying(
+        retry=retry_if_exception_type((_RetryableStatus, httpx.TransportError)),
+        wait=_retry_wait,
+        stop=stop_after_attempt(_RETRY_ATTEMPTS),
+        reraise=True,
+    )
+
+
+async def _stream_search(
+    url: str, headers: Dict[str, str], content: bytes
+) -> Tuple[Optional[str], Optional[int], List[Dict[str, Any]]]:
+    """POST de búsqueda que parsea `value` de forma incremental con ijson.
+
+    Los documentos se construyen a medida que llegan los bytes, sin retener el
+    cuerpo completo en memoria junto a los objetos ya parseados. Aplica la misma
+    política de reintentos que `_request_with_retry`.
+
+    Returns:
+        tuple: (error, `@odata.count`, documentos). `error` es None si todo fue bien.
+    """
+    import ijson
+
+    async def _attempt() -> Tuple[Optional[str], Optional[int], List[Dict[str, Any]]]:
+        async with _request_slots:
+            async with _get_http_client().stream("POST", url, headers=headers, content=content) as resp:
+                if resp.status_code >= 400:
+                    await resp.aread()
+                    if resp.status_code in _RETRY_STATUS:
+                        raise _RetryableStatus(resp)
+                    return f"Azure Search error {resp.status_code}: {resp.text}", None, []
+
+                # Una sola pasada de eventos: `@odata.count` y los documentos de `value`
+                docs: List[Dict[str, Any]] = []
+                count: Optional[int] = None
+                builder: Optional[ijson.ObjectBuilder] = None
+                events = ijson.sendable_list()
+                parser = ijson.parse_coro(events, use_float=True)
+
+                def _consume() -> None:
+                    nonlocal builder, count
+                    for prefix, event, value in events:
+                        if builder is not None:
+                            builder.event(event, value)
+                            if prefix == "value.item" and event in ("end_map", "end_array"):
+                                docs.append(builder.value)
+                                builder = None
+                        elif prefix == "value.item":
+                            if event in ("start_map", "start_array"):
+                                builder = ijson.ObjectBuilder()
+                                builder.event(event, value)
+                            else:
+                                docs.append(value)
+                        elif prefix == "@odata.count" and event == "number":
+                            count = int(value)
+                    del events[:]
+
+                async for chunk in resp.aiter_bytes():
+                    parser.send(chunk)
+                    _consume()
+                parser.close()
+                _consume()
+                return None, count, docs
+
+    try:
+        return await _retrying()(_attempt)
+    except _RetryableStatus as e:
+        return f"Azure Search error {e.response.status_code}: {e.response.text}", None, []
+
+
+# Versión de la API REST de Azure Search (vectorQueries, semántico y Lookup)
+_SEARCH_API_VERSION = "2024-07-01"
+
+# Escapa comillas simples en literales OData ('' dentro de '...')
+_ODATA_TABLE = str.maketrans({"'": "''"})
+
+
+def _escape_odata(value: Any) -> str:
+    """Escapa un valor para usarlo dentro de un literal de cadena OData."""
+    return str(value).translate(_ODATA_TABLE)
+
+
+# Constructores de cláusulas OData por filtro; un valor vacío devuelve None y se omite
+_FILTER_BUILDERS: Dict[str, Callable[[Any], Optional[str]]] = {
+    "store_id": lambda v: f"store_id eq '{_escape_odata(v)}'" if str(v).strip() else None,
+    "min_price": lambda v: f"price ge {float(v)}",
+    "max_price": lambda v: f"price le {float(v)}",
+    # Si existiera un campo 'category' en el índice
+    "category": lambda v: f"category eq '{_escape_odata(v)}'",
+    # Si existiera 'stock_quantity' en el índice
+    "in_stock": lambda v: "stock_quantity gt 0" if v else "stock_quantity eq 0",
+}
+
+# Campos devueltos por las búsquedas por SKU
+_SKU_SELECT_FIELDS = "name,sku,price,description"
+
+# Caché de búsquedas por SKU. Los aciertos viven SKU_CACHE_TTL segundos; los
+# SKU inexistentes se recuerdan menos tiempo para no ocultar altas recientes.
+_sku_cache: TTLCache = TTLCache(maxsize=settings.SKU_CACHE_MAXSIZE, ttl=settings.SKU_CACHE_TTL)
+_sku_miss_cache: TTLCache = TTLCache(maxsize=settings.SKU_CACHE_MAXSIZE, ttl=settings.SKU_CACHE_NEGATIVE_TTL)
+
+
+class _SkuLock:
+    """Lock de un SKU con el número de corrutinas que lo usan o esperan."""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+# Un lock por SKU en vuelo evita que N peticiones simultáneas consulten Azure a la vez.
+# La entrada se retira cuando ya nadie la usa ni la espera (`users` llega a 0).
+_sku_locks: Dict[str, _SkuLock] = {}
+
+
+def invalidate_sku_cache(sku: Optional[str] = None) -> None:
+    """Invalida la caché de búsquedas por SKU.
+
+    Debe llamarse cuando cambie el precio o el stock de un producto.
+
+    Args:
+        sku: SKU a invalidar. Si es None se vacía toda la caché.
+    """
+    if sku is None:
+        _sku_cache.clear()
+        _sku_miss_cache.clear()
+        return
+    _sku_cache.pop(sku, None)
+    _sku_miss_cache.pop(sku, None)
+
+
+async def _fetch_embeddings(texts: List[str]) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """Obtiene embeddings para varios textos en un solo POST (Azure OpenAI u OpenAI).
+
+    Returns:
+        tuple: (matriz float32 de forma (len(texts), dim) en el mismo orden que
+        `texts`, error). Si hay error, la matriz será None.
+    """
+    try:
+        # Preferir Azure OpenAI si está configurado
+        if (
+            settings.AZURE_OPENAI_API_KEY
+            and settings.AZURE_OPENAI_ENDPOINT
+            and settings.AZURE_OPENAI_API_VERSION
+            and settings.AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT
+        ):
+            provider = "Azure OpenAI"
+            url = (
+                f"{settings.AZURE_OPENAI_ENDPOINT.rstrip('/')}/openai/deployments/"
+                f"{settings.AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT}/embeddings?api-version="
+                f"{settings.AZURE_OPENAI_API_VERSION}"
+            )
+            headers = {
+                "api-key": settings.AZURE_OPENAI_API_KEY,
+                "Content-Type": "application/json",
+            }
+            payload: Dict[str, Any] = {"input": texts}
+        # Fallback a OpenAI estándar
+        elif settings.OPENAI_API_KEY or settings.LLM_API_KEY:
+            provider = "OpenAI"
+            url = f"{settings.OPENAI_BASE_URL.rstrip('/')}/embeddings"
+            headers = {
+                "Authorization": f"Bearer {settings.OPENAI_API_KEY or settings.LLM_API_KEY}",
+                "Content-Type": "application/json",
+            }
+            payload = {
+                "model": settings.OPENAI_EMBEDDINGS_MODEL,
+                "input": texts,
+            }
+        else:
+            return None, "No hay configuración de embeddings (Azure/OpenAI)"
+
+        body = _dumps(payload)
+        if settings.EMBEDDINGS_GZIP_REQUESTS and len(body) >= _GZIP_MIN_BYTES:
+            # Nivel 1: casi toda la reducción de tamaño con un coste de CPU mínimo
+            body = gzip.compress(body, compresslevel=1)
+            headers["Content-Encoding"] = "gzip"
+        resp = await _request_with_retry("POST", url, headers=headers, content=body)
+        if resp.status_code >= 400:
+            return None, f"{provider} error {resp.status_code}: {resp.text}"
+        data = orjson.loads(resp.content).get("data") or []
+        # La API devuelve un elemento por entrada con su `index`
+        vectors = [item.get("embedding") for item in sorted(data, key=lambda d: d.get("index", 0))]
+        if len(vectors) != len(texts) or not all(isinstance(v, list) for v in vectors):
+            return None, f"Respuesta de embeddings inválida ({provider})"
+        import numpy as np
+
+        # float32 ocupa la mitad que float64 y mucho menos que una lista de PyFloat
+        return np.asarray(vectors, dtype=np.float32), None
+    except Exception as e:
+        return None, str(e)
+
+
+class _EmbeddingBatcher:
+    """Agrupa peticiones de embeddings concurrentes en un solo POST.
+
+    Si no hay ninguna petición en curso, el texto se envía de inmediato (sin
+    espera añadida). Mientras hay una en curso, los textos nuevos se acumulan
+    hasta `max_batch` o durante `max_wait_ms` y se envían juntos.
+    """
+
+    def __init__(self, max_batch: int, max_wait_ms: int) -> None:
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._inflight = 0
+
+    async def submit(self, text: str) -> Tuple[Optional[np.ndarray], Optional[str]]:
+        """Retorna (vector, error) para `text`."""
+        if self._inflight == 0 and not self._pending:
+            self._inflight += 1
+            try:
+                vectors, error = await _fetch_embeddings([text])
+            finally:
+                self._inflight -= 1
+            return (vectors[0], None) if vectors is not None else (None, error)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.max_wait)
+        self._timer = None
+        self._flush()
+
+    def _flush(self) -> None:
+        batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch:]
+        if batch:
+            asyncio.create_task(self._run(batch))
+        if self._pending and self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        self._inflight += 1
+        try:
+            vectors, error = await _fetch_embeddings([text for text, _ in batch])
+        finally:
+            self._inflight -= 1
+        for i, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result((vectors[i], None) if vectors is not None else (None, error))
+
+
+# Caché consulta -> embedding. La clave incluye proveedor y modelo para no
+# mezclar vectores de dimensiones distintas si cambia la configuración.
+_embedding_cache: TTLCache = TTLCache(
+    maxsize=settings.EMBEDDINGS_CACHE_MAXSIZE, ttl=settings.EMBEDDINGS_CACHE_TTL
+)
+_embedding_cache_stats: Dict[str, int] = {"hits": 0, "misses": 0, "coalesced": 0}
+# Cálculos de embedding en curso por clave de caché
+_embedding_inflight: Dict[Tuple[str, str, bytes], asyncio.Future] = {}
+
+
+def _embedding_cache_key(text: str) -> Tuple[str, str, bytes]:
+    """Clave compacta (proveedor, modelo, hash del texto) para la caché de embeddings."""
+    if settings.AZURE_OPENAI_API_KEY and settings.AZURE_OPENAI_ENDPOINT:
+        target = ("azure-openai", settings.AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT)
+    else:
+        target = ("openai", settings.OPENAI_EMBEDDINGS_MODEL)
+    return (*target, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest())
+
+
+def get_embedding_cache_stats() -> Dict[str, int]:
+    """Retorna aciertos, fallos, peticiones agrupadas y tamaño de la caché de embeddings."""
+    return {**_embedding_cache_stats, "size": len(_embedding_cache)}
+
+
+def _finish_embedding(key: Tuple[str, str, bytes], task: asyncio.Future) -> None:
+    """Libera la entrada en vuelo y cachea el vector si el cálculo tuvo éxito."""
+    _embedding_inflight.pop(key, None)
+    if task.cancelled() or task.exception() is not None:
+        return
+    vector, _ = task.result()
+    if vector is not None:
+        _embedding_cache[key] = vector
+
+
+_embedding_batcher = _EmbeddingBatcher(
+    max_batch=settings.EMBEDDINGS_BATCH_MAX,
+    max_wait_ms=settings.EMBEDDINGS_BATCH_WAIT_MS,
+)
+
 
 @dataclass
 class AzureSearchConfig:
@@ -47,93 +470,65 @@ class AzureAISearchService:
         self.openai_client = openai_client
         self.config = config or AzureSearchConfig()
 
+        # URLs y headers invariantes: se calculan una vez y se reutilizan en cada consulta
+        if settings.AZURE_SEARCH_ENDPOINT:
+            self._search_base = settings.AZURE_SEARCH_ENDPOINT.rstrip("/")
+        elif settings.AZURE_SEARCH_SERVICE_NAME:
+            self._search_base = f"https://{settings.AZURE_SEARCH_SERVICE_NAME}.search.windows.net"
+        else:
+            self._search_base = ""
+        self._docs_url = f"{self._search_base}/indexes/{self.config.index_name}/docs"
+        self._search_url = f"{self._docs_url}/search?api-version={_SEARCH_API_VERSION}"
+        self._search_headers = {
+            "api-key": settings.AZURE_SEARCH_API_KEY,
+            "Content-Type": "application/json",
+        }
+        self._vector_field = settings.AZURE_SEARCH_VECTOR_FIELD
+        self._semantic_config = settings.AZURE_SEARCH_SEMANTIC_CONFIG
+        self._sku_field = settings.AZURE_SEARCH_SKU_FIELD
+        self._use_sku_lookup = settings.AZURE_SEARCH_SKU_FIELD == settings.AZURE_SEARCH_KEY_FIELD
+
     # --------------- Utilidades internas ---------------
-    async def _get_embeddings(self, text: str) -> Tuple[Optional[List[float]], Optional[str]]:
+    async def _get_embeddings(self, text: str) -> Tuple[Optional[np.ndarray], Optional[str]]:
         """Obtiene embeddings usando Azure OpenAI u OpenAI estándar.
 
+        Las llamadas concurrentes se agrupan en un único POST mediante
+        `_embedding_batcher`, y las que piden el mismo texto comparten una sola
+        tarea en vuelo en lugar de solicitarlo de nuevo.
+
         Returns:
             tuple: (vector, error). Si hay error, vector será None.
         """
-        try:
-            # Preferir Azure OpenAI si está configurado
-            if (
-                settings.AZURE_OPENAI_API_KEY
-                and settings.AZURE_OPENAI_ENDPOINT
-                and settings.AZURE_OPENAI_API_VERSION
-                and settings.AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT
-            ):
-                url = (
-                    f"{settings.AZURE_OPENAI_ENDPOINT.rstrip('/')}/openai/deployments/"
-                    f"{settings.AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT}/embeddings?api-version="
-                    f"{settings.AZURE_OPENAI_API_VERSION}"
-                )
-                headers = {
-                    "api-key": settings.AZURE_OPENAI_API_KEY,
-                    "Content-Type": "application/json",
-                }
-                payload = {"input": text}
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    resp = await client.post(url, headers=headers, json=payload)
-                if resp.status_code >= 400:
-                    return None, f"Azure OpenAI error {resp.status_code}: {resp.text}"
-                data = resp.json()
-                vector = data.get("data", [{}])[0].get("embedding")
-                if not isinstance(vector, list):
-                    return None, "Respuesta de embeddings inválida (Azure OpenAI)"
-                return vector, None
-
-            # Fallback a OpenAI estándar
-            api_key = settings.OPENAI_API_KEY or settings.LLM_API_KEY
-            if api_key:
-                url = f"{settings.OPENAI_BASE_URL.rstrip('/')}/embeddings"
-                headers = {
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                }
-                payload = {
-                    "model": settings.OPENAI_EMBEDDINGS_MODEL,
-                    "input": text,
-                }
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    resp = await client.post(url, headers=headers, json=payload)
-                if resp.status_code >= 400:
-                    return None, f"OpenAI error {resp.status_code}: {resp.text}"
-                data = resp.json()
-                vector = data.get("data", [{}])[0].get("embedding")
-                if not isinstance(vector, list):
-                    return None, "Respuesta de embeddings inválida (OpenAI)"
-                return vector, None
-
-            return None, "No hay configuración de embeddings (Azure/OpenAI)"
-        except Exception as e:
-            return None, str(e)
+        key = _embedding_cache_key(text)
+        vector = _embedding_cache.get(key)
+        if vector is not None:
+            _embedding_cache_stats["hits"] += 1
+            return vector, None
+        _embedding_cache_stats["misses"] += 1
+
+        task = _embedding_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(_embedding_batcher.submit(text))
+            _embedding_inflight[key] = task
+            task.add_done_callback(functools.partial(_finish_embedding, key))
+        else:
+            _embedding_cache_stats["coalesced"] += 1
+        # shield: cancelar a un solicitante no cancela el cálculo que otros esperan
+        return await asyncio.shield(task)
 
     def _build_odata_filter(self, filters: Optional[Dict[str, Any]]) -> Optional[str]:
         """Construye filtro OData para Azure Search a partir de filtros simples.
 
         Soporta actualmente: store_id (exacto), min_price, max_price, category, in_stock.
+        Las cláusulas se emiten siempre en el orden de `_FILTER_BUILDERS`.
         """
         if not filters:
             return None
-        parts: List[str] = []
-        if "store_id" in filters and str(filters["store_id"]).strip():
-            val = str(filters["store_id"]).replace("'", "''")
-            parts.append(f"store_id eq '{val}'")
-        if "min_price" in filters:
-            parts.append(f"price ge {filters['min_price']}")
-        if "max_price" in filters:
-            parts.append(f"price le {filters['max_price']}")
-        
-        if "category" in filters:
-            # Si existiera un campo 'category' en el índice
-            val_cat = str(filters["category"]).replace("'", "''")
-            parts.append(f"category eq '{val_cat}'")
-        if "in_stock" in filters:
-            # Si existiera 'stock_quantity' en el índice
-            if filters["in_stock"]:
-                parts.append("stock_quantity gt 0")
-            else:
-                parts.append("stock_quantity eq 0")
+        parts = [
+            clause
+            for key, build in _FILTER_BUILDERS.items()
+            if key in filters and (clause := build(filters[key]))
+        ]
         return " and ".join(parts) if parts else None
 
     async def search_by_content_vector(self, query: str, top: int = 5, use_hybrid: bool = True, model_name: Optional[str] = None) -> Dict[str, Any]:
@@ -210,22 +605,52 @@ class AzureAISearchService:
             }
 
         # Intentar embeddings (si hay proveedor configurado)
-        embeddings: Optional[List[float]] = None
+        embeddings: Optional[np.ndarray] = None
         embeddings_error: Optional[str] = None
         if self.openai_client:
+            threshold = settings.SEARCH_LEXICAL_PREFETCH_SCORE
+            if use_hybrid and threshold > 0 and _embedding_cache_key(query) not in _embedding_cache:
+                return await self._search_with_prefetch(query, top, filters, threshold)
             embeddings, embeddings_error = await self._get_embeddings(query)
 
-        # Construir request de búsqueda
-        api_version = "2023-11-01"
-        # Construir endpoint a partir de SERVICE_NAME si no hay ENDPOINT completo
-        if settings.AZURE_SEARCH_ENDPOINT:
-            base = settings.AZURE_SEARCH_ENDPOINT.rstrip("/")
-        elif settings.AZURE_SEARCH_SERVICE_NAME:
-            base = f"https://{settings.AZURE_SEARCH_SERVICE_NAME}.search.windows.net"
-        else:
-            base = ""
-
-        if not base:
+        return await self._search_one(query, embeddings, top, use_hybrid, filters, embeddings_error)
+
+    async def _search_with_prefetch(
+        self,
+        query: str,
+        top: int,
+        filters: Optional[Dict[str, Any]],
+        threshold: float,
+    ) -> Dict[str, Any]:
+        """Lanza la búsqueda lexical mientras se calcula el embedding.
+
+        Si el mejor documento lexical alcanza `threshold` (`@search.score`), se
+        responde con él sin esperar el embedding (que termina en segundo plano y
+        queda en caché); si no, se espera el vector y se ejecuta la búsqueda
+        híbrida completa.
+        """
+        embed_task = asyncio.create_task(self._get_embeddings(query))
+        lexical = await self._search_one(query, None, top, True, filters)
+        docs = lexical.get("documents") or []
+        if not lexical.get("error") and docs and (docs[0].get("@search.score") or 0) >= threshold:
+            embed_task.cancel()
+            lexical["search_type"] = "lexical_prefetch"
+            return lexical
+
+        embeddings, embeddings_error = await embed_task
+        return await self._search_one(query, embeddings, top, True, filters, embeddings_error)
+
+    async def _search_one(
+        self,
+        query: str,
+        embeddings: Optional[np.ndarray],
+        top: int,
+        use_hybrid: bool,
+        filters: Optional[Dict[str, Any]],
+        embeddings_error: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Ejecuta una consulta contra Azure Search con el vector ya calculado."""
+        if not self._search_base:
             return {
                 "error": "Azure Search no configurado (endpoint/service_name)",
                 "total_count": 0,
@@ -233,14 +658,6 @@ class AzureAISearchService:
                 "search_type": "product_vector_stub",
             }
 
-        url = (
-            f"{base}/indexes/{self.config.index_name}/docs/search?api-version={api_version}"
-        )
-        headers = {
-            "api-key": settings.AZURE_SEARCH_API_KEY,
-            "Content-Type": "application/json",
-        }
-
         payload: Dict[str, Any] = {
             "count": True,
             "top": top,
@@ -250,86 +667,58 @@ class AzureAISearchService:
         if odata_filter:
             payload["filter"] = odata_filter
 
-        # Vector query si hay embeddings (usar 'vectors' en api-version 2023-11-01)
-        vector_field = settings.AZURE_SEARCH_VECTOR_FIELD
+        # Vector query si hay embeddings
         search_type = "lexical"
-        if embeddings and isinstance(embeddings, list):
-            payload["vectors"] = [
+        if embeddings is not None:
+            payload["vectorQueries"] = [
                 {
-                    "value": embeddings,
-                    "fields": vector_field,
+                    "kind": "vector",
+                    "vector": embeddings,
+                    "fields": self._vector_field,
                     "k": top,
                 }
             ]
             search_type = "product_vector"
 
-        # Híbrido: agregar término lexical además de vector
+        # Híbrido: el término lexical va en la misma llamada y Azure fusiona
+        # ambos rankings (RRF); con configuración semántica además re-ordena
         if use_hybrid:
-            payload["queryType"] = "simple"
             payload["search"] = query
+            if self._semantic_config and query.strip() not in ("", "*"):
+                payload["queryType"] = "semantic"
+                payload["semanticConfiguration"] = self._semantic_config
+                search_type = f"{search_type}_semantic"
+            else:
+                payload["queryType"] = "simple"
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                resp = await client.post(url, headers=headers, json=payload)
-            if resp.status_code >= 400:
-                # Fallback: algunos servicios usan 'vectorQueries' (API 2024-07-01)
-                body_text = resp.text.lower()
-                if embeddings and ("vectors" in body_text and "not a valid parameter" in body_text):
-                    try:
-                        api_version_fallback = "2024-07-01"
-                        url_fb = f"{base}/indexes/{self.config.index_name}/docs/search?api-version={api_version_fallback}"
-                        payload_fb: Dict[str, Any] = {
-                            "count": True,
-                            "top": top,
-                        }
-                        if odata_filter:
-                            payload_fb["filter"] = odata_filter
-                        if use_hybrid:
-                            payload_fb["queryType"] = "simple"
-                            payload_fb["search"] = query
-                        payload_fb["vectorQueries"] = [
-                            {
-                                "kind": "vector",
-                                "vector": embeddings,
-                                "fields": vector_field,
-                                "k": top,
-                            }
-                        ]
-                        async with httpx.AsyncClient(timeout=30.0) as client:
-                            resp_fb = await client.post(url_fb, headers=headers, json=payload_fb)
-                        if resp_fb.status_code >= 400:
-                            return {
-                                "error": f"Azure Search error {resp_fb.status_code}: {resp_fb.text}",
-                                "total_count": 0,
-                                "documents": [],
-                                "search_type": search_type,
-                            }
-                        data = resp_fb.json()
-                        docs = data.get("value", [])
-                        total = data.get("@odata.count", len(docs))
-                        return {
-                            "error": None,
-                            "total_count": total or len(docs),
-                            "documents": docs,
-                            "search_type": search_type,
-                        }
-                    except Exception as e_fb:
-                        return {
-                            "error": str(e_fb),
-                            "total_count": 0,
-                            "documents": [],
-                            "search_type": search_type,
-                        }
-                return {
-                    "error": f"Azure Search error {resp.status_code}: {resp.text}",
-                    "total_count": 0,
-                    "documents": [],
-                    "search_type": search_type,
-                }
-
-            data = resp.json()
-            docs = data.get("value", [])
-            total = data.get("@odata.count", len(docs))
+            stream_min_top = settings.AZURE_SEARCH_STREAM_MIN_TOP
+            if stream_min_top and top >= stream_min_top:
+                # Listados grandes: parseo incremental en lugar de cargar todo el cuerpo
+                error, total, docs = await _stream_search(self._search_url, self._search_headers, _dumps(payload))
+                if error:
+                    return {
+                        "error": error,
+                        "total_count": 0,
+                        "documents": [],
+                        "search_type": search_type,
+                    }
+            else:
+                resp = await _request_with_retry("POST", self._search_url, headers=self._search_headers, content=_dumps(payload))
+                if resp.status_code >= 400:
+                    return {
+                        "error": f"Azure Search error {resp.status_code}: {resp.text}",
+                        "total_count": 0,
+                        "documents": [],
+                        "search_type": search_type,
+                    }
+                data = orjson.loads(resp.content)
+                docs = data.get("value", [])
+                total = data.get("@odata.count")
+
+            for doc in docs:
+                # Puntuación del re-ranker semántico (None si no se aplicó)
+                doc["reranker_score"] = doc.pop("@search.rerankerScore", None)
             return {
                 "error": None,
                 "total_count": total or len(docs),
@@ -345,11 +734,82 @@ class AzureAISearchService:
                 "embeddings_error": embeddings_error,
             }
 
+    async def _get_embeddings_batch(self, texts: List[str]) -> Tuple[List[Optional[np.ndarray]], Optional[str]]:
+        """Obtiene embeddings para varios textos con un único POST para los no cacheados."""
+        keys = [_embedding_cache_key(t) for t in texts]
+        vectors: List[Optional[np.ndarray]] = [_embedding_cache.get(k) for k in keys]
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        _embedding_cache_stats["hits"] += len(texts) - sum(v is None for v in vectors)
+        _embedding_cache_stats["misses"] += len(missing)
+        if not missing:
+            return vectors, None
+
+        fetched, error = await _fetch_embeddings(missing)
+        if fetched is None:
+            return vectors, error
+        by_text = dict(zip(missing, fetched))
+        for i, (text, key) in enumerate(zip(texts, keys)):
+            if vectors[i] is None:
+                vectors[i] = by_text[text]
+                _embedding_cache[key] = by_text[text]
+        return vectors, None
+
+    async def batch_search_products(
+        self,
+        queries: List[str],
+        top: int = 5,
+        use_hybrid: bool = True,
+        filters: Optional[Dict[str, Any]] = None,
+        dedupe: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Busca varios textos de producto en paralelo con un solo cálculo de embeddings.
+
+        Los embeddings de todas las consultas se piden en un único POST y las
+        búsquedas en Azure Search se lanzan de forma concurrente. Con `dedupe=True`
+        un SKU solo aparece en la primera consulta que lo devuelve.
+
+        Returns:
+            list: Un resultado por consulta, en el mismo orden, con la misma
+            estructura que `search_products_by_text`.
+        """
+        if not settings.AZURE_SEARCH_ENDPOINT or not settings.AZURE_SEARCH_API_KEY or not (self.config and self.config.index_name):
+            return [
+                {
+                    "error": "Azure Search no configurado (endpoint/api_key/index)",
+                    "total_count": 0,
+                    "documents": [],
+                    "search_type": "product_vector_stub",
+                }
+                for _ in queries
+            ]
+
+        vectors: List[Optional[np.ndarray]] = [None] * len(queries)
+        embeddings_error: Optional[str] = None
+        if self.openai_client and queries:
+            vectors, embeddings_error = await self._get_embeddings_batch(queries)
+
+        results = await asyncio.gather(
+            *(self._search_one(q, vec, top, use_hybrid, filters, embeddings_error) for q, vec in zip(queries, vectors))
+        )
+
+        if dedupe:
+            seen: set = set()
+            for result in results:
+                unique = []
+                for doc in result.get("documents", []):
+                    sku = doc.get("sku")
+                    if sku is None or sku not in seen:
+                        seen.add(sku)
+                        unique.append(doc)
+                result["documents"] = unique
+        return list(results)
+
     async def search_product_by_sku(self, sku: str) -> Dict[str, Any]:
-        """Busca un producto por SKU exacto (stub).
+        """Busca un producto por SKU exacto, con caché TTL en memoria.
 
         Esta búsqueda no requiere embeddings; se espera un filtro exacto
-        sobre el campo `sku` en el índice de productos.
+        sobre el campo `sku` en el índice de productos. Se cachean tanto los
+        aciertos como los SKU inexistentes; los errores nunca se cachean.
 
         Args:
             sku: Código de referencia único del producto.
@@ -357,21 +817,141 @@ class AzureAISearchService:
         Returns:
             dict: Estructura con `error`, `total_count`, `documents`, `search_type`.
         """
-        # Implementación real pendiente. Retorna 0 resultados por defecto.
-        return {
-            "error": None,
-            "total_count": 0,
-            "documents": [],
-            "search_type": "sku_filter_stub",
-        }
+        cached = _sku_cache.get(sku) or _sku_miss_cache.get(sku)
+        if cached is not None:
+            return cached
+
+        entry = _sku_locks.get(sku)
+        if entry is None:
+            entry = _sku_locks[sku] = _SkuLock()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                # Otra petición pudo haber llenado la caché mientras esperábamos
+                cached = _sku_cache.get(sku) or _sku_miss_cache.get(sku)
+                if cached is not None:
+                    return cached
+                result = await self._lookup_sku(sku)
+                if not result.get("error"):
+                    target = _sku_cache if result.get("documents") else _sku_miss_cache
+                    target[sku] = result
+                return result
+        finally:
+            # `lock.locked()` ya es False aunque haya corrutinas en cola; el
+            # contador es lo que indica si alguien sigue dependiendo del lock
+            entry.users -= 1
+            if entry.users == 0 and _sku_locks.get(sku) is entry:
+                del _sku_locks[sku]
+
+    async def _lookup_sku(self, sku: str) -> Dict[str, Any]:
+        """Consulta el índice por SKU exacto sin pasar por la caché.
+
+        Si el SKU es la clave del documento se usa la API de Lookup
+        (`GET /docs/{key}`), que resuelve por id sin pasar por el analizador.
+        En otro caso se recurre a un `$filter` exacto sobre el campo SKU.
+        Un SKU inexistente retorna `documents` vacío, no un error.
+        """
+        if not self._search_base or not settings.AZURE_SEARCH_API_KEY:
+            return {
+                "error": "Azure Search no configurado (endpoint/api_key/index)",
+                "total_count": 0,
+                "documents": [],
+                "search_type": "sku_filter_stub",
+            }
+
+        search_type = "sku_lookup" if self._use_sku_lookup else "sku_filter"
+
+        try:
+            if self._use_sku_lookup:
+                resp = await _request_with_retry(
+                    "GET",
+                    f"{self._docs_url}/{quote(sku, safe='')}",
+                    params={"api-version": _SEARCH_API_VERSION, "$select": _SKU_SELECT_FIELDS},
+                    headers=self._search_headers,
+                )
+                if resp.status_code == 404:
+                    docs: List[Dict[str, Any]] = []
+                elif resp.status_code >= 400:
+                    return {
+                        "error": f"Azure Search error {resp.status_code}: {resp.text}",
+                        "total_count": 0,
+                        "documents": [],
+                        "search_type": search_type,
+                    }
+                else:
+                    doc = orjson.loads(resp.content)
+                    # Lookup devuelve metadatos OData que el filtro no incluye
+                    doc.pop("@odata.context", None)
+                    docs = [doc]
+            else:
+                sku_literal = _escape_odata(sku)
+                payload = {
+                    "filter": f"{self._sku_field} eq '{sku_literal}'",
+                    "select": _SKU_SELECT_FIELDS,
+                    "top": 1,
+                }
+                resp = await _request_with_retry(
+                    "POST",
+                    self._search_url,
+                    headers=self._search_headers,
+                    content=_dumps(payload),
+                )
+                if resp.status_code >= 400:
+                    return {
+                        "error": f"Azure Search error {resp.status_code}: {resp.text}",
+                        "total_count": 0,
+                        "documents": [],
+                        "search_type": search_type,
+                    }
+                docs = orjson.loads(resp.content).get("value", [])
+
+            return {
+                "error": None,
+                "total_count": len(docs),
+                "documents": docs,
+                "search_type": search_type,
+            }
+        except Exception as e:
+            return {
+                "error": str(e),
+                "total_count": 0,
+                "documents": [],
+                "search_type": search_type,
+            }
+
+
+# Instancia única del servicio por proceso y contadores de reutilización
+_service_singleton: Optional[AzureAISearchService] = None
+_service_stats: Dict[str, int] = {"hits": 0, "misses": 0}
 
 
 def get_azure_search_service() -> AzureAISearchService:
-    """Crea y retorna una instancia del servicio de búsqueda.
+    """Retorna la instancia compartida del servicio de búsqueda.
+
+    Esta función es el punto de entrada que utilizan las tools. La instancia
+    se construye en la primera llamada y se reutiliza después. Es síncrona y
+    no cede el control al event loop, por lo que no requiere lock.
+    """
+    global _service_singleton
+    if _service_singleton is not None:
+        _service_stats["hits"] += 1
+        return _service_singleton
+    _service_stats["misses"] += 1
+    _service_singleton = _build_azure_search_service()
+    return _service_singleton
+
+
+def get_service_cache_stats() -> Dict[str, int]:
+    """Retorna los contadores de aciertos/fallos del singleton del servicio."""
+    return dict(_service_stats)
+
+
+def _build_azure_search_service() -> AzureAISearchService:
+    """Crea una instancia del servicio de búsqueda desde la configuración.
 
-    Esta función es el punto de entrada que utilizan las tools. Devuelve una
-    instancia con un cliente de embeddings mínimo si hay claves presentes en
-    variables de entorno. Si no, retorna `openai_client=None` para modo stub.
+    Devuelve una instancia con un cliente de embeddings mínimo si hay claves
+    presentes en variables de entorno. Si no, retorna `openai_client=None`
+    para modo stub.
     """
     # Construir configuración básica del índice desde envs si existen
     index_name = settings.AZURE_SEARCH_INDEX_NAME or "stub-index"
@@ -412,6 +992,11 @@ __all__ = [
     "AzureAISearchService",
     "AzureSearchConfig",
     "get_azure_search_service",
+    "get_service_cache_stats",
+    "get_embedding_cache_stats",
+    "aclose_http_client",
+    "warm_up_http_client",
+    "invalidate_sku_cache",
 ]
 
 
@@ -12,25 +12,187 @@ Esquema esperado de tabla de ventas:
     created_at timestamp NOT NULL,
     updated_at timestamp NOT NULL,
     total_amount double precision NOT NULL,
-    products json NOT NULL,
-    client_json json NOT NULL
+    products jsonb NOT NULL,
+    client_json jsonb NOT NULL
 )
+
+Las columnas JSON usan `jsonb`: Postgres guarda el documento ya parseado y
+no vuelve a interpretar el texto en cada lectura. Migración de tablas
+existentes creadas con `json`:
+
+    ALTER TABLE <tabla> ALTER COLUMN products TYPE jsonb USING products::jsonb;
+    ALTER TABLE <tabla> ALTER COLUMN client_json TYPE jsonb USING client_json::jsonb;
 """
 
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from contextlib import nullcontext
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Mapping, NamedTuple, Optional, Tuple
 import logging
+import re
 from sqlalchemy import bindparam
 from sqlalchemy import text
-from sqlalchemy.dialects.postgresql import JSON as PG_JSON
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 
+from sqlmodel import Session
+
 from database.connection import database_service
 
 
 logger = logging.getLogger("purchase-service")
 
+# Filas por sentencia en inserciones masivas (4 parámetros por fila; Postgres
+# admite hasta 65535 parámetros por sentencia)
+_BULK_CHUNK_ROWS = 1000
+
+# Filas por lote al leer compras con cursor del servidor (`iter_purchases`)
+_YIELD_PER_ROWS = 50
+
+# Campos de `client_json`: (clave de salida, campo de la compra, pasar a minúsculas)
+_CLIENT_FIELD_SPEC = (
+    ("direccion", "client_address", False),
+    ("ciudad", "client_city", False),
+    ("cedula", "client_document", False),
+    ("nombre_completo", "client_full_name", False),
+    ("celular", "client_phone", False),
+    ("correo", "client_email", True),
+)
+
+def _strip_str(value: Any) -> str:
+    """`str(value).strip()` sin crear una copia si el valor ya es str."""
+    return (value if isinstance(value, str) else str(value)).strip()
+
+
+def _identity(value: Any) -> Any:
+    """Devuelve el valor sin convertir (columnas JSONB)."""
+    return value
+
+
+# Columnas del INSERT tomadas directamente de la compra, con su conversión
+# (`client_json` se construye aparte a partir de `_CLIENT_FIELD_SPEC`)
+_INSERT_FIELDS: Tuple[Tuple[str, Callable[[Any], Any]], ...] = (
+    ("total_amount", float),
+    ("client_phone", _strip_str),
+    ("products", _identity),
+)
+
+# Identificador SQL simple: único formato de tabla que se interpola en las sentencias
+_TABLE_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _check_table(table: str) -> str:
+    """Valida que `table` sea una tabla mapeada y un identificador seguro de interpolar.
+
+    Raises:
+        PurchaseServiceError: Si la tabla no está permitida (400).
+    """
+    if table not in _store_tables().allowed or not _TABLE_NAME_RE.match(table):
+        raise PurchaseServiceError(f"Tabla no permitida: {table!r}", status_code=400)
+    return table
+
+
+@lru_cache(maxsize=32)
+def _insert_sql(table: str, rows: int) -> TextClause:
+    """INSERT ... RETURNING para `rows` filas, compilado una vez por (tabla, filas).
+
+    Los parámetros se numeran por fila (`:client_phone_0`, `:client_phone_1`, ...);
+    ver `_numbered_params`.
+    """
+    _check_table(table)
+    suffixes = [f"_{i}" for i in range(rows)]
+    values_sql = ", ".join(
+        f"(:client_phone{sfx}, NOW(), NOW(), :total_amount{sfx}, :products{sfx}, :client_json{sfx})"
+        for sfx in suffixes
+    )
+    return text(
+        f"""
+        INSERT INTO {table} (client_phone, created_at, updated_at, total_amount, products, client_json)
+        VALUES {values_sql}
+        RETURNING id, client_phone, created_at, updated_at, total_amount, products, client_json
+        """
+    ).bindparams(
+        *(bindparam(f"{name}{sfx}", type_=JSONB()) for sfx in suffixes for name in ("products", "client_json"))
+    )
+
+
+def _numbered_params(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aplana los parámetros de varias filas con el sufijo que espera `_insert_sql`."""
+    return {f"{key}_{i}": value for i, row in enumerate(rows) for key, value in row.items()}
+
+
+@lru_cache(maxsize=16)
+def _select_sql(table: str, keyset: bool = False) -> TextClause:
+    """SELECT paginado de compras, compilado una vez por (tabla, modo).
+
+    Las fechas se formatean a ISO8601 en Postgres, así cada fila llega lista
+    para serializar sin conversión en Python. Con `keyset=True` la página se
+    delimita con `id < :before_id` (recorrido del índice de la PK) en lugar
+    de OFFSET, cuyo coste crece con la profundidad de la página. La sentencia
+    ya lleva `yield_per` para que `iter_purchases` lea con cursor del servidor.
+    """
+    _check_table(table)
+    page_sql = "WHERE id < :before_id ORDER BY id DESC LIMIT :limit" if keyset else "ORDER BY id DESC LIMIT :limit OFFSET :offset"
+    return text(
+        f"""
+        SELECT id, client_phone,
+               to_char(created_at, 'YYYY-MM-DD"T"HH24:MI:SS.US') AS created_at,
+               to_char(updated_at, 'YYYY-MM-DD"T"HH24:MI:SS.US') AS updated_at,
+               total_amount, products, client_json
+        FROM {table}
+        {page_sql}
+        """
+    ).execution_options(yield_per=_YIELD_PER_ROWS)
+
+
+class _StoreTables(NamedTuple):
+    """Datos derivados de `PurchaseService.STORE_TABLE_MAP`."""
+
+    source: Mapping[str, str]
+    normalized: Dict[str, str]
+    # Únicas tablas que pueden interpolarse en el SQL
+    allowed: FrozenSet[str]
+
+
+_store_tables_state: Optional[_StoreTables] = None
+
+
+def _store_tables() -> _StoreTables:
+    """Devuelve los datos derivados del mapa de tiendas, reconstruyéndolos si cambió.
+
+    `STORE_TABLE_MAP` es inmutable, así que la única forma de cambiarlo es
+    reasignar el atributo (recarga de configuración, pruebas con
+    `mock.patch.object`); se detecta por identidad y se limpian las cachés
+    que dependen del mapa.
+    """
+    global _store_tables_state
+    source = PurchaseService.STORE_TABLE_MAP
+    state = _store_tables_state
+    if state is None or state.source is not source:
+        state = _store_tables_state = _StoreTables(
+            source=source,
+            normalized={k.strip().lower(): v for k, v in source.items()},
+            allowed=frozenset(source.values()),
+        )
+        _lookup_table.cache_clear()
+        _insert_sql.cache_clear()
+        _select_sql.cache_clear()
+    return state
+
+
+@lru_cache(maxsize=64)
+def _lookup_table(key: str) -> Optional[str]:
+    """Tabla mapeada para un store_id ya normalizado (strip + lower), o la de "default".
+
+    La caché es de módulo y se indexa solo por la cadena, no por la instancia
+    del servicio.
+    """
+    table_map = _store_tables().normalized
+    return table_map.get(key) or table_map.get("default")
+
 
 class PurchaseServiceError(Exception):
     """Error de alto nivel para operaciones de compras."""
@@ -44,11 +206,12 @@ class PurchaseServiceError(Exception):
 class PurchaseService:
     """Servicio para guardar y leer compras por tienda."""
 
-    # Mapa de store_id -> nombre de tabla real
-    STORE_TABLE_MAP: Dict[str, str] = {
+    # Mapa de store_id -> nombre de tabla real. Es de solo lectura: para
+    # cambiarlo se reasigna el atributo completo (ver `_store_tables`).
+    STORE_TABLE_MAP: Mapping[str, str] = MappingProxyType({
         # Ejemplos; reemplazar/expandir según despliegue real
         "4f22df54942898f1": "ventas_mauricio"
-    }
+    })
 
     def resolve_table_name(self, store_id: str) -> str:
         """
@@ -59,28 +222,102 @@ class PurchaseService:
 
         Returns:
             Nombre real de la tabla donde se guardan/leen compras.
+
+        Raises:
+            PurchaseServiceError: Si el store_id no es texto o no tiene tabla (400).
         """
-        key = (store_id or "").strip().lower()
-        table_name = self.STORE_TABLE_MAP.get(key) or self.STORE_TABLE_MAP.get("default")
+        if store_id is not None and not isinstance(store_id, str):
+            raise PurchaseServiceError("El store_id debe ser un texto", status_code=400)
 
+        _store_tables()
+        table_name = _lookup_table((store_id or "").strip().lower())
         if not table_name:
             raise PurchaseServiceError("No hay tabla configurada para el store_id dado", status_code=400)
         return table_name
 
-    def save_purchase(self, store_id: str, purchase: Dict[str, Any]) -> Dict[str, Any]:
+    def save_purchase(
+        self,
+        store_id: str,
+        purchase: Dict[str, Any],
+        *,
+        session: Optional[Session] = None,
+        commit: bool = True,
+    ) -> Dict[str, Any]:
         """
         Guarda una compra en la tabla correspondiente al store.
 
+        Para guardar varias compras con un solo commit, pasar una sesión
+        propia con `commit=False` y hacer `session.commit()` al final.
+
         Args:
             store_id: Identificador de la tienda para mapear la tabla.
             purchase: Datos de la compra incluyendo `total_amount`, `client_phone`,
                 datos del cliente por separado para construir `client_json` y `products`.
+            session: Sesión existente a reutilizar; si no se pasa, se abre una nueva.
+            commit: Si es False, no se hace commit y la transacción queda abierta.
+                Requiere `session`: con una sesión propia del servicio, el
+                INSERT se perdería al cerrarla.
 
         Returns:
             Diccionario con confirmación y datos persistidos.
+
+        Raises:
+            ValueError: Si `commit` es False y no se pasa `session`.
+        """
+        if not commit and session is None:
+            raise ValueError("commit=False requiere pasar una sesión propia en `session`")
+        table = self.resolve_table_name(store_id)
+        params = self._purchase_params(purchase)
+
+        ctx = nullcontext(session) if session is not None else database_service.get_session_context()
+        with ctx as session:
+            # Inserción; se asume que la tabla existe con las columnas esperadas
+            insert_sql = _insert_sql(table, 1)
+
+            # RETURNING: la fila persistida llega en el mismo round-trip del INSERT
+            row = session.exec(insert_sql, params=_numbered_params([params])).first()
+            if commit:
+                session.commit()
+            if not row:
+                raise PurchaseServiceError("No fue posible leer la compra recién guardada", status_code=500)
+
+            return self._serialize_row(row, table)
+
+    def save_purchases_bulk(self, store_id: str, purchases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Guarda varias compras en una sola transacción con INSERT multi-fila.
+
+        Usar en lugar de llamar `save_purchase` en un bucle: cada sentencia
+        inserta hasta `_BULK_CHUNK_ROWS` filas y devuelve las filas persistidas
+        vía RETURNING. Todas las compras se validan antes de escribir; si una
+        es inválida no se guarda ninguna.
+
+        Args:
+            store_id: Identificador de la tienda para mapear la tabla.
+            purchases: Lista de compras con el mismo formato que `save_purchase`.
+
+        Returns:
+            Lista de compras persistidas, ordenadas por id (orden de inserción).
         """
         table = self.resolve_table_name(store_id)
+        rows_params = [self._purchase_params(p) for p in purchases]
+        if not rows_params:
+            return []
 
+        results: List[Dict[str, Any]] = []
+        with database_service.get_session_context() as session:
+            for start in range(0, len(rows_params), _BULK_CHUNK_ROWS):
+                chunk = rows_params[start:start + _BULK_CHUNK_ROWS]
+                insert_sql = _insert_sql(table, len(chunk))
+                rows = session.exec(insert_sql, params=_numbered_params(chunk)).all()
+                # El orden de RETURNING no está garantizado; el id sí sigue el orden de inserción
+                results.extend(self._serialize_row(row, table) for row in sorted(rows, key=lambda r: r.id))
+            session.commit()
+        return results
+
+    @staticmethod
+    def _purchase_params(purchase: Dict[str, Any]) -> Dict[str, Any]:
+        """Valida una compra y construye los parámetros del INSERT (incluido `client_json`)."""
         # Campos requeridos para cumplir el nuevo esquema
         required = [
             "total_amount",
@@ -97,94 +334,88 @@ class PurchaseService:
         if missing:
             raise PurchaseServiceError(f"Faltan campos requeridos: {', '.join(missing)}", status_code=422)
 
-        with database_service.get_session_context() as session:
-            # Construir JSON del cliente según requerimiento
-            client_json: Dict[str, Any] = {
-                "direccion": str(purchase["client_address"]).strip(),
-                "ciudad": str(purchase["client_city"]).strip(),
-                "cedula": str(purchase["client_document"]).strip(),
-                "nombre_completo": str(purchase["client_full_name"]).strip(),
-                "celular": str(purchase["client_phone"]).strip(),
-                "correo": (str(purchase["client_email"]).strip().lower() if purchase.get("client_email") else None),
-            }
-
-            # Inserción; se asume que la tabla existe con las columnas esperadas
-            insert_sql = text(
-                f"""
-                INSERT INTO {table} (client_phone, created_at, updated_at, total_amount, products, client_json)
-                VALUES (:client_phone, NOW(), NOW(), :total_amount, :products, :client_json)
-                """
-            ).bindparams(
-                bindparam("products", type_=PG_JSON()),
-                bindparam("client_json", type_=PG_JSON()),
-            )
-
-            session.exec(insert_sql, params={
-                "total_amount": float(purchase["total_amount"]),
-                "client_phone": str(purchase["client_phone"]).strip(),
-                "products": purchase["products"],
-                "client_json": client_json,
-            })
-            session.commit()
-
-            # Recuperar último registro persistido (heurística portable)
-            select_sql = text(
-                f"""
-                SELECT id, client_phone, created_at, updated_at, total_amount, products, client_json
-                FROM {table}
-                ORDER BY id DESC
-                LIMIT 1
-                """
-            )
-            row = session.exec(select_sql).first()
-            if not row:
-                raise PurchaseServiceError("No fue posible leer la compra recién guardada", status_code=500)
-
-            result = dict(row._mapping) if hasattr(row, "_mapping") else dict(row)
-            # Normalizar datetimes a ISO8601 para facilitar serialización JSON
-            for key in ("created_at", "updated_at"):
-                value = result.get(key)
-                if isinstance(value, datetime):
-                    result[key] = value.isoformat()
-            result["table"] = table
-            return result
-
-    def get_purchases(self, store_id: str, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        # Construir JSON del cliente según requerimiento
+        client_json: Dict[str, Any] = {}
+        for out_key, src_key, lower in _CLIENT_FIELD_SPEC:
+            value = purchase[src_key]
+            if lower and not value:
+                client_json[out_key] = None
+                continue
+            value = _strip_str(value)
+            client_json[out_key] = value.lower() if lower else value
+        params = {name: convert(purchase[name]) for name, convert in _INSERT_FIELDS}
+        params["client_json"] = client_json
+        return params
+
+    @staticmethod
+    def _serialize_row(row: Any, table: str) -> Dict[str, Any]:
+        """Convierte una fila de compra en dict con datetimes ISO8601 y la tabla de origen."""
+        result = dict(row._mapping) if hasattr(row, "_mapping") else dict(row)
+        # Normalizar datetimes a ISO8601 para facilitar serialización JSON
+        for key in ("created_at", "updated_at"):
+            value = result.get(key)
+            if isinstance(value, datetime):
+                result[key] = value.isoformat()
+        result["table"] = table
+        return result
+
+    def get_purchases(
+        self,
+        store_id: str,
+        limit: int = 50,
+        offset: int = 0,
+        before_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
         """
-        Lee compras desde la tabla correspondiente al store.
+        Lee compras desde la tabla correspondiente al store, de la más reciente a la más antigua.
 
         Args:
             store_id: Identificador de la tienda para mapear la tabla.
             limit: Límite de registros a recuperar.
-            offset: Desplazamiento de registros.
+            offset: Desplazamiento de registros (se ignora si se indica `before_id`).
+            before_id: Cursor de paginación: solo compras con id menor. Usar el
+                id de la última compra de la página anterior.
 
         Returns:
             Lista de compras serializadas.
         """
+        return list(self.iter_purchases(store_id, limit=limit, offset=offset, before_id=before_id))
+
+    def iter_purchases(
+        self,
+        store_id: str,
+        limit: int = 50,
+        offset: int = 0,
+        before_id: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Igual que `get_purchases`, pero entrega las compras una a una.
+
+        Las filas se leen del cursor del servidor en lotes de `_YIELD_PER_ROWS`,
+        sin materializar la página completa. La sesión permanece abierta hasta
+        agotar (o cerrar) el iterador. El store_id se valida al llamar, no al
+        iterar.
+
+        Returns:
+            Iterador de compras serializadas.
+        """
         table = self.resolve_table_name(store_id)
         limit = max(1, min(limit, 200))
-        offset = max(0, offset)
 
-        with database_service.get_session_context() as session:
-            sql = text(
-                f"""
-                SELECT id, client_phone, created_at, updated_at, total_amount, products, client_json
-                FROM {table}
-                ORDER BY id DESC
-                LIMIT :limit OFFSET :offset
-                """
-            )
-            rows = session.exec(sql, params={"limit": limit, "offset": offset}).all()
-            results: List[Dict[str, Any]] = []
-            for row in rows:
-                data = dict(row._mapping) if hasattr(row, "_mapping") else dict(row)
-                for key in ("created_at", "updated_at"):
-                    value = data.get(key)
-                    if isinstance(value, datetime):
-                        data[key] = value.isoformat()
-                data["table"] = table
-                results.append(data)
-            return results
+        if before_id is not None:
+            sql = _select_sql(table, keyset=True)
+            params = {"limit": limit, "before_id": before_id}
+        else:
+            sql = _select_sql(table)
+            params = {"limit": limit, "offset": max(0, offset)}
+
+        def _rows() -> Iterator[Dict[str, Any]]:
+            with database_service.get_session_context() as session:
+                result = session.exec(sql, params=params)
+                for row in result:
+                    yield {**row._mapping, "table": table}
+
+        return _rows()
 
 
 purchase_service = PurchaseService()
@@ -8,17 +8,29 @@ audios y videos a través del servidor de WhatsApp.
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple
+import asyncio
 import logging
 import os
-import secrets
+import random
+import re
+import time
 
-import requests
+import httpx
+import phonenumbers
 from core.config import settings
 
 logger = logging.getLogger("colombiang-mcp.whatsapp")
 logger.setLevel(logging.INFO)
 
+# Esquemas de URL no soportados por el servidor de WhatsApp (sin distinguir mayúsculas)
+_BAD_SCHEME_RE = re.compile(r"^(?:file|data):", re.IGNORECASE)
+
+# Generador para los sufijos de nombres de archivo; no necesitan ser impredecibles
+_rng = random.Random()
+_PDF_NAME_PREFIX = "document"
+
 
 class WhatsAppServiceError(Exception):
     """Excepción de alto nivel para errores del servicio de WhatsApp."""
@@ -37,6 +49,10 @@ class WhatsAppConfig:
     default_timeout_seconds: float = 10.0
     long_timeout_seconds: float = 60.0
     api_key: Optional[str] = None
+    max_connections: int = 64
+    max_keepalive_connections: int = 32
+    connect_retries: int = 2
+    http2: bool = True
 
     @classmethod
     def from_env(cls) -> "WhatsAppConfig":
@@ -61,21 +77,44 @@ class WhatsAppConfig:
             default_timeout_seconds=default_timeout,
             long_timeout_seconds=long_timeout,
             api_key=api_key,
+            max_connections=int(os.getenv("WHATSAPP_MAX_CONNECTIONS", "64")),
+            max_keepalive_connections=int(os.getenv("WHATSAPP_MAX_KEEPALIVE", "32")),
+            connect_retries=int(os.getenv("WHATSAPP_CONNECT_RETRIES", "2")),
+            http2=os.getenv("WHATSAPP_HTTP2", "true").lower() in ("1", "true", "yes"),
         )
 
 
-def _normalize_phone(phone: str) -> str:
-    """Normaliza el número a formato internacional con prefijo '+'."""
+@lru_cache(maxsize=4096)
+def normalize_phone(phone: str) -> str:
+    """Normaliza y valida el número en formato E.164 (p. ej. '+573204259649').
+
+    El resultado se cachea por número, de modo que los destinatarios
+    recurrentes no vuelven a pasar por `phonenumbers`.
+
+    Raises:
+        WhatsAppServiceError: Si el número está vacío o no es válido (422).
+    """
     if not phone:
         raise WhatsAppServiceError("Phone number is required", status_code=422)
-    return phone if phone.startswith("+") else f"+{phone}"
+    candidate = phone if phone.startswith("+") else f"+{phone}"
+    try:
+        parsed = phonenumbers.parse(candidate, None)
+    except phonenumbers.NumberParseException:
+        raise WhatsAppServiceError(f"Invalid phone number: {phone}", status_code=422)
+    if not phonenumbers.is_valid_number(parsed):
+        raise WhatsAppServiceError(f"Invalid phone number: {phone}", status_code=422)
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
 
 
 def _validate_public_url(url: str) -> None:
-    """Valida que la URL sea pública y soportada."""
+    """Valida que la URL sea pública y soportada.
+
+    Sin caché: la comprobación es un único match anclado al inicio, y una
+    caché por URL completa retendría URLs `data:` de varios MB.
+    """
     if not url or not isinstance(url, str):
         raise WhatsAppServiceError("Invalid URL", status_code=422)
-    if url.startswith("file:") or url.startswith("data:"):
+    if _BAD_SCHEME_RE.match(url):
         raise WhatsAppServiceError("Unsupported URL scheme", status_code=415)
 
 
@@ -90,7 +129,6 @@ class WhatsAppService:
         """
         self.config = config or WhatsAppConfig.from_env()
         self.base_url = self.config.base_url.rstrip("/")
-        self.session = requests.Session()
         self.default_timeout = self.config.default_timeout_seconds
         self.long_timeout = self.config.long_timeout_seconds
 
@@ -99,14 +137,44 @@ class WhatsAppService:
         if self.config.api_key:
             self._auth_headers["Authorization"] = f"Bearer {self.config.api_key}"
 
-    def _post_json(self, path: str, payload: Dict[str, Any], port: int = 3001, *, long: bool = False) -> Dict[str, Any]:
+        # Cliente asíncrono compartido con pool de conexiones keep-alive. Solo se
+        # reintenta el establecimiento de conexión: un POST ya entregado no se
+        # repite para no duplicar mensajes en WhatsApp. HTTP/2 solo se negocia
+        # (ALPN) sobre https, p. ej. con un proxy inverso delante de Baileys.
+        limits = httpx.Limits(
+            max_connections=self.config.max_connections,
+            max_keepalive_connections=self.config.max_keepalive_connections,
+            keepalive_expiry=60,
+        )
+        self._client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                http2=self.config.http2,
+                limits=limits,
+                retries=self.config.connect_retries,
+            ),
+            headers=self._auth_headers,
+            timeout=self.default_timeout,
+        )
+        # Base "host:puerto" por puerto; los puertos usados son pocos y fijos
+        self._base_urls: Dict[int, str] = {}
+
+    def _base_url_for(self, port: int) -> str:
+        """Devuelve (y cachea) la URL base del servidor para `port`."""
+        url = self._base_urls.get(port)
+        if url is None:
+            url = self._base_urls[port] = f"{self.base_url}:{port}"
+        return url
+
+    async def aclose(self) -> None:
+        """Cierra el cliente HTTP y libera las conexiones del pool."""
+        await self._client.aclose()
+
+    async def _post_json(self, path: str, payload: Dict[str, Any], port: int = 3001, *, long: bool = False) -> Dict[str, Any]:
         """Realiza POST JSON con control de timeout, autenticación y manejo de errores."""
         try:
-            url_with_port = f"{self.base_url}:{port}"
-            response = self.session.post(
-                f"{url_with_port}{path}",
+            response = await self._client.post(
+                f"{self._base_url_for(port)}{path}",
                 json=payload,
-                headers=self._auth_headers or None,
                 timeout=self.long_timeout if long else self.default_timeout,
             )
             if response.status_code == 200:
@@ -116,27 +184,73 @@ class WhatsAppService:
             else:
                 error = response.text
             raise WhatsAppServiceError(f"HTTP {response.status_code}: {error}", status_code=response.status_code)
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             raise WhatsAppServiceError("Timeout en solicitud a WhatsApp", status_code=408)
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             raise WhatsAppServiceError("No se puede conectar con el servidor de WhatsApp", status_code=503)
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             raise WhatsAppServiceError(f"Error de red: {str(e)}", status_code=500)
 
-    def check_whatsapp_status(self) -> Dict[str, Any]:
+    async def check_whatsapp_status(self) -> Dict[str, Any]:
         """Verifica estado del servidor de WhatsApp."""
         try:
-            url_with_port = f"{self.base_url}:3001"
-            response = self.session.get(f"{url_with_port}/api/status", headers=self._auth_headers or None, timeout=5)
+            response = await self._client.get(f"{self._base_url_for(3001)}/api/status", timeout=5)
             if response.status_code == 200:
                 return response.json()
             raise WhatsAppServiceError(f"HTTP {response.status_code}: {response.text}", status_code=response.status_code)
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             raise WhatsAppServiceError("Timeout al verificar estado de WhatsApp", status_code=408)
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             raise WhatsAppServiceError("No se puede conectar con el servidor de WhatsApp", status_code=503)
 
-    def send_image(self, phone: str, image_url: str, port: int = 3001, caption: Optional[str] = None) -> Dict[str, Any]:
+    # Tipo de medio -> (endpoint, clave de la URL en el payload, timeout largo, admite caption)
+    _MEDIA_SPEC: Dict[str, Tuple[str, str, bool, bool]] = {
+        "image": ("/api/send-image-url", "imageUrl", False, True),
+        "audio": ("/api/send-audio-url", "audioUrl", False, False),
+        "video": ("/api/send-video-url", "videoUrl", True, True),
+        "pdf": ("/api/send-pdf-url", "pdfUrl", False, True),
+    }
+
+    async def _send_media(
+        self,
+        kind: str,
+        phone: str,
+        url: str,
+        port: int = 3001,
+        caption: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Envía un medio de tipo `kind` según `_MEDIA_SPEC`.
+
+        Args:
+            kind: "image", "audio", "video" o "pdf"
+            phone: Número del destinatario
+            url: URL pública del medio
+            port: Puerto del servidor WhatsApp a usar (por defecto 3001)
+            caption: Texto opcional (ignorado si el tipo no lo admite)
+            extra: Campos adicionales del payload (p. ej. `fileName` del PDF)
+
+        Raises:
+            WhatsAppServiceError: Si el tipo no está soportado (422) o falla el envío
+        """
+        spec = self._MEDIA_SPEC.get(kind)
+        if spec is None:
+            raise WhatsAppServiceError(f"Unsupported message type: {kind}", status_code=422)
+        path, url_key, long, supports_caption = spec
+
+        phone = normalize_phone(phone)
+        _validate_public_url(url)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"sending_{kind}", extra={"phone": phone, "media_url": url, "port": port, "has_caption": caption is not None})
+        payload: Dict[str, Any] = {"phone": phone, url_key: url}
+        if extra:
+            payload.update(extra)
+        if caption and supports_caption:
+            payload["caption"] = caption
+        return await self._post_json(path, payload, port=port, long=long)
+
+    async def send_image(self, phone: str, image_url: str, port: int = 3001, caption: Optional[str] = None) -> Dict[str, Any]:
         """
         Envía una imagen por WhatsApp a partir de una URL pública.
 
@@ -146,15 +260,9 @@ class WhatsAppService:
             port: Puerto del servidor WhatsApp a usar (por defecto 3001)
             caption: Texto opcional
         """
-        phone = _normalize_phone(phone)
-        _validate_public_url(image_url)
-        logger.info("sending_image", extra={"phone": phone, "image_url": image_url, "port": port, "has_caption": caption is not None})
-        payload: Dict[str, Any] = {"phone": phone, "imageUrl": image_url}
-        if caption:
-            payload["caption"] = caption
-        return self._post_json("/api/send-image-url", payload, port=port)
+        return await self._send_media("image", phone, image_url, port=port, caption=caption)
 
-    def send_audio(self, phone: str, audio_url: str, port: int = 3001) -> Dict[str, Any]:
+    async def send_audio(self, phone: str, audio_url: str, port: int = 3001) -> Dict[str, Any]:
         """
         Envía un audio por WhatsApp desde una URL pública.
 
@@ -163,14 +271,9 @@ class WhatsAppService:
             audio_url: URL pública del audio (mp3/ogg)
             port: Puerto del servidor WhatsApp a usar (por defecto 3001)
         """
-        phone = _normalize_phone(phone)
-        _validate_public_url(audio_url)
-        logger.info("sending_audio", extra={"phone": phone, "audio_url": audio_url, "port": port})
-        payload: Dict[str, Any] = {"phone": phone, "audioUrl": audio_url}
-        
-        return self._post_json("/api/send-audio-url", payload, port=port)
+        return await self._send_media("audio", phone, audio_url, port=port)
 
-    def send_video(self, phone: str, video_url: str, port: int = 3001, caption: Optional[str] = None) -> Dict[str, Any]:
+    async def send_video(self, phone: str, video_url: str, port: int = 3001, caption: Optional[str] = None) -> Dict[str, Any]:
         """
         Envía un video por WhatsApp desde una URL pública.
 
@@ -180,13 +283,7 @@ class WhatsAppService:
             port: Puerto del servidor WhatsApp a usar (por defecto 3001)
             caption: Texto opcional
         """
-        phone = _normalize_phone(phone)
-        _validate_public_url(video_url)
-        logger.info("sending_video", extra={"phone": phone, "video_url": video_url, "port": port})
-        payload: Dict[str, Any] = {"phone": phone, "videoUrl": video_url}
-        if caption:
-            payload["caption"] = caption
-        return self._post_json("/api/send-video-url", payload, port=port, long=True)
+        return await self._send_media("video", phone, video_url, port=port, caption=caption)
 
     def _generate_hashed_filename(self, base_filename: str = "document.pdf") -> str:
         """
@@ -198,11 +295,14 @@ class WhatsAppService:
         Returns:
             Nombre de archivo con hash aleatorio y extensión .pdf, ej: document-1a2b3c4d.pdf
         """
-        name_without_ext = base_filename.rsplit(".", 1)[0] if "." in base_filename else base_filename
-        random_hash = secrets.token_hex(4)
+        if base_filename == "document.pdf":
+            name_without_ext = _PDF_NAME_PREFIX
+        else:
+            name_without_ext = base_filename.rsplit(".", 1)[0] if "." in base_filename else base_filename
+        random_hash = f"{_rng.getrandbits(32):08x}"
         return f"{name_without_ext}-{random_hash}.pdf"
 
-    def send_pdf(self, phone: str, pdf_url: str, port: int = 3001, caption: Optional[str] = None) -> Dict[str, Any]:
+    async def send_pdf(self, phone: str, pdf_url: str, port: int = 3001, caption: Optional[str] = None) -> Dict[str, Any]:
         """
         Envía un documento PDF por WhatsApp a partir de una URL pública.
 
@@ -212,14 +312,55 @@ class WhatsAppService:
             port: Puerto del servidor WhatsApp a usar (por defecto 3001)
             caption: Texto opcional (no enviado; reservado para compatibilidad)
         """
-        phone = _normalize_phone(phone)
-        _validate_public_url(pdf_url)
-        logger.info("sending_pdf", extra={"phone": phone, "pdf_url": pdf_url, "port": port})
         file_name = self._generate_hashed_filename("document.pdf")
-        payload: Dict[str, Any] = {"phone": phone, "pdfUrl": pdf_url, "fileName": file_name}
-        if caption:
-            payload["caption"] = caption
-        return self._post_json("/api/send-pdf-url", payload, port=port)
+        return await self._send_media("pdf", phone, pdf_url, port=port, caption=caption, extra={"fileName": file_name})
+
+    async def send_many(self, messages: List[Dict[str, Any]], port: int = 3001) -> List[Dict[str, Any]]:
+        """
+        Envía varios medios en paralelo sobre el mismo pool de conexiones.
+
+        Cada mensaje es un dict con `type` ("image", "audio", "video" o "pdf"),
+        `phone`, `url` y opcionalmente `caption` y `port`. Un fallo individual
+        no cancela el resto: se devuelve un resultado por mensaje, en el mismo
+        orden de entrada.
+
+        Args:
+            messages: Lista de mensajes a enviar
+            port: Puerto por defecto del servidor WhatsApp
+
+        Returns:
+            Lista de dicts con `status` "success" (y `data`) o "error"
+            (con `message` y `status_code`)
+        """
+        async def _send(message: Dict[str, Any]) -> Dict[str, Any]:
+            try:
+                kind = message.get("type")
+                extra = {"fileName": self._generate_hashed_filename()} if kind == "pdf" else None
+                result = await self._send_media(
+                    kind,
+                    message.get("phone", ""),
+                    message.get("url", ""),
+                    port=message.get("port", port),
+                    caption=message.get("caption"),
+                    extra=extra,
+                )
+                return {"status": "success", "data": result}
+            except WhatsAppServiceError as e:
+                return {"status": "error", "message": e.message, "status_code": e.status_code}
+            except Exception as e:
+                return {"status": "error", "message": str(e), "status_code": 500}
+
+        started = time.perf_counter()
+        results = list(await asyncio.gather(*(_send(m) for m in messages)))
+        logger.info(
+            "sent_batch",
+            extra={
+                "count": len(results),
+                "errors": sum(1 for r in results if r["status"] != "success"),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            },
+        )
+        return results
 
 
 # Instancia global del servicio
@@ -231,5 +372,6 @@ __all__ = [
     "WhatsAppConfig",
     "WhatsAppService",
     "whatsapp_service",
+    "normalize_phone",
 ]
 
@@ -3,16 +3,98 @@ Script simple para probar la inserción de una compra usando PurchaseService.
 
 Ajusta los valores de `store_id` y de los campos del cliente según tu entorno.
 Ejecuta: `python -m src.test_purchase_service` desde la raíz del proyecto (si tu PYTHONPATH lo permite)
-o `python mcp/src/test_purchase_service.py` según tu estructura local.
+o `python mcp/src/test_purchase_service.py` según tu estructura local. Con `--batch N`
+inserta N compras en lote y compara contra inserciones individuales; con
+`--concurrent N` lanza N inserciones individuales en paralelo; con `--rows N`
+inserta N compras aleatorias (`--products-per-row`, `--seed`) y mide latencias.
 """
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
-import json
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+import orjson
 
 from services import purchase_service, PurchaseServiceError
 
+# Valores de ejemplo: ajusta según tu mapeo en PurchaseService.STORE_TABLE_MAP
+STORE_ID: str = "4f22df54942898f1"
+_CLIENT: Dict[str, str] = {
+    "client_phone": "+573204259649",
+    "client_full_name": "Juan Pérez",
+    "client_document": "1234567890",
+    "client_address": "Calle 123 #45-67",
+    "client_city": "Bogotá",
+    "client_email": "juan.perez@example.com",
+}
+_PRODUCTS: List[Dict[str, Any]] = [
+    {"product_id": "hash_producto_1", "quantity": 2, "unit_price": 150000.0},
+    {"product_id": "hash_producto_2", "quantity": 1, "unit_price": 299900.0},
+]
+_PRODUCTS_TOTAL: float = sum(float(p["unit_price"]) * int(p["quantity"]) for p in _PRODUCTS)
+
+
+# Salida en bytes directamente al buffer de stdout (sin recodificar str -> UTF-8 en print)
+_write = sys.stdout.buffer.write
+_ERR_SERVICE_PREFIX = b"Error de servicio ("
+_ERR_UNEXPECTED_PREFIX = b"Error inesperado: "
+
+
+def _report_error(e: Exception) -> None:
+    """Escribe un error del servicio o inesperado en stdout."""
+    if isinstance(e, PurchaseServiceError):
+        _write(_ERR_SERVICE_PREFIX + str(e.status_code).encode() + b"): " + e.message.encode() + b"\n")
+    else:
+        _write(_ERR_UNEXPECTED_PREFIX + str(e).encode() + b"\n")
+
+
+def build_purchase(total_amount: Optional[float] = None) -> Dict[str, Any]:
+    """Construye una compra de ejemplo a partir de las constantes del módulo.
+
+    La lista de productos es compartida entre compras (no se copia); el
+    servicio no la modifica.
+
+    Args:
+        total_amount: Total a registrar; por defecto el calculado de los productos.
+    """
+    # total_amount será calculado por la tool en entorno MCP, pero aquí
+    # lo enviamos directamente al servicio, consistente con API del servicio.
+    return {
+        **_CLIENT,
+        "total_amount": _PRODUCTS_TOTAL if total_amount is None else total_amount,
+        "products": _PRODUCTS,
+    }
+
+
+def random_purchase(rng: random.Random, products_per_row: int = 20) -> Dict[str, Any]:
+    """Construye una compra con productos y montos aleatorios (reproducibles con `rng`).
+
+    Args:
+        rng: Generador a usar; con la misma semilla se obtienen las mismas compras.
+        products_per_row: Máximo de productos por compra (se elige entre 1 y este valor).
+    """
+    products = [
+        {
+            "product_id": f"hash_producto_{rng.randint(1, 1000)}",
+            "quantity": rng.randint(1, 10),
+            "unit_price": round(rng.uniform(100, 100_000), 2),
+        }
+        for _ in range(rng.randint(1, max(1, products_per_row)))
+    ]
+    total_amount = round(sum(p["unit_price"] * p["quantity"] for p in products), 2)
+    return {**_CLIENT, "total_amount": total_amount, "products": products}
+
+
+def _percentile(sorted_values: List[int], pct: float) -> int:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
 
 def run_test_insert() -> None:
     """Ejecuta una inserción de prueba en la tabla mapeada por store_id.
@@ -20,45 +102,123 @@ def run_test_insert() -> None:
     Inserta un registro de compra con un conjunto de productos de ejemplo
     y muestra por consola la respuesta del servicio.
     """
-    # Valores de ejemplo: ajusta según tu mapeo en PurchaseService.STORE_TABLE_MAP
-    store_id: str = "4f22df54942898f1"
-    client_phone: str = "+573204259649"
-    client_full_name: str = "Juan Pérez"
-    client_document: str = "1234567890"
-    client_address: str = "Calle 123 #45-67"
-    client_city: str = "Bogotá"
-    client_email: str = "juan.perez@example.com"
-    products: List[Dict[str, Any]] = [
-        {"product_id": "hash_producto_1", "quantity": 2, "unit_price": 150000.0},
-        {"product_id": "hash_producto_2", "quantity": 1, "unit_price": 299900.0},
-    ]
+    try:
+        result = purchase_service.save_purchase(store_id=STORE_ID, purchase=build_purchase())
+        _write(b"Insert OK:\n")
+        _write(orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        _write(b"\n")
+    except Exception as e:
+        _report_error(e)
 
-    # total_amount será calculado por la tool en entorno MCP, pero aquí
-    # lo enviamos directamente al servicio, consistente con API del servicio.
-    total_amount: float = sum(float(p["unit_price"]) * int(p["quantity"]) for p in products)
+
+def run_test_insert_batch(n: int = 10_000, products_per_row: int = 20, seed: int = 0) -> None:
+    """Inserta `n` compras con `save_purchases_bulk` y compara contra inserciones individuales.
+
+    Mide una muestra de inserciones de una fila con `save_purchase` y luego
+    el lote completo con INSERT multi-fila, mostrando filas/s de cada camino.
+    Ojo: ambas pruebas escriben filas reales en la tabla de la tienda.
+    """
+    rng = random.Random(seed)
+    purchases = [random_purchase(rng, products_per_row) for _ in range(n)]
+    sample = purchases[: min(n, 100)]
+
+    # Referencias locales: evitan la búsqueda de atributos en cada iteración
+    save = purchase_service.save_purchase
 
     try:
-        result = purchase_service.save_purchase(
-            store_id=store_id,
-            purchase={
-                "total_amount": total_amount,
-                "client_phone": client_phone,
-                "client_full_name": client_full_name,
-                "client_document": client_document,
-                "client_address": client_address,
-                "client_city": client_city,
-                "client_email": client_email,
-                "products": products,
-            },
-        )
-        print("Insert OK:\n" + json.dumps(result, ensure_ascii=False, indent=2))
-    except PurchaseServiceError as e:
-        print(f"Error de servicio ({e.status_code}): {e.message}")
+        started = time.perf_counter()
+        for purchase in sample:
+            save(store_id=STORE_ID, purchase=purchase)
+        single_rate = len(sample) / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        saved = purchase_service.save_purchases_bulk(STORE_ID, purchases)
+        bulk_rate = len(saved) / (time.perf_counter() - started)
     except Exception as e:
-        print(f"Error inesperado: {str(e)}")
+        _report_error(e)
+        return
 
+    _write(f"Individual: {single_rate:,.0f} filas/s ({len(sample)} filas)\n".encode())
+    _write(f"Lote:       {bulk_rate:,.0f} filas/s ({len(saved)} filas)\n".encode())
+    _write(f"Mejora:     x{bulk_rate / single_rate:,.1f}\n".encode())
 
-if __name__ == "__main__":
-    run_test_insert()
 
+def run_test_insert_timed(rows: int, products_per_row: int = 20, seed: int = 0) -> None:
+    """Inserta `rows` compras aleatorias una a una y muestra filas/s y latencias p50/p95.
+
+    Las compras se generan antes de medir, de modo que el tiempo registrado
+    corresponde solo a `save_purchase`.
+    """
+    rng = random.Random(seed)
+    purchases = [random_purchase(rng, products_per_row) for _ in range(rows)]
+    latencies_ns: List[int] = []
+
+    # Referencias locales: evitan la búsqueda de atributos en cada iteración
+    save = purchase_service.save_purchase
+    clock = time.perf_counter_ns
+    record = latencies_ns.append
+    store_id = STORE_ID
+
+    try:
+        started = clock()
+        for purchase in purchases:
+            call_started = clock()
+            save(store_id=store_id, purchase=purchase)
+            record(clock() - call_started)
+        elapsed_ns = clock() - started
+    except Exception as e:
+        _report_error(e)
+        return
+
+    latencies_ns.sort()
+    p50_ms = _percentile(latencies_ns, 50) / 1e6
+    p95_ms = _percentile(latencies_ns, 95) / 1e6
+    _write(
+        f"Individual: {rows / (elapsed_ns / 1e9):,.0f} filas/s ({rows} filas), "
+        f"p50 {p50_ms:,.2f} ms, p95 {p95_ms:,.2f} ms\n".encode()
+    )
+
+
+async def run_test_insert_concurrent(k: int = 20, products_per_row: int = 20, seed: int = 0) -> None:
+    """Lanza `k` inserciones individuales concurrentes y muestra el throughput.
+
+    `save_purchase` es síncrono, así que cada inserción corre en un hilo con
+    `asyncio.to_thread`; la concurrencia real queda limitada por el pool del
+    engine (`POSTGRES_POOL_SIZE` + `POSTGRES_MAX_OVERFLOW`).
+    """
+    rng = random.Random(seed)
+    purchases = [random_purchase(rng, products_per_row) for _ in range(k)]
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(asyncio.to_thread(purchase_service.save_purchase, store_id=STORE_ID, purchase=p) for p in purchases),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - started
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    for e in errors[:3]:
+        _report_error(e)
+    ok = len(results) - len(errors)
+    _write(f"Concurrente: {ok}/{k} filas en {elapsed * 1000:,.0f} ms ({ok / elapsed:,.0f} filas/s)\n".encode())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pruebas de inserción de compras")
+    parser.add_argument("--batch", type=int, metavar="N", help="Insertar N compras en lote y comparar tiempos")
+    parser.add_argument("--concurrent", type=int, metavar="N", help="Lanzar N inserciones individuales concurrentes")
+    parser.add_argument("--rows", type=int, metavar="N", help="Insertar N compras aleatorias una a una y medir latencias")
+    parser.add_argument("--products-per-row", type=int, default=20, metavar="K", help="Máximo de productos por compra aleatoria")
+    parser.add_argument("--seed", type=int, default=0, metavar="S", help="Semilla de las compras aleatorias")
+    args = parser.parse_args()
+    # Vaciar lo que ya se haya escrito por la capa de texto antes de escribir bytes
+    sys.stdout.flush()
 
+    if args.concurrent:
+        asyncio.run(run_test_insert_concurrent(args.concurrent, args.products_per_row, args.seed))
+    elif args.rows:
+        run_test_insert_timed(args.rows, args.products_per_row, args.seed)
+    elif args.batch:
+        run_test_insert_batch(args.batch, args.products_per_row, args.seed)
+    else:
+        run_test_insert()
+    sys.stdout.buffer.flush()